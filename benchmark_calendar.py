@@ -0,0 +1,242 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import create_calendar
+from udfs import holidays_udfs, io_udfs
+
+# calendar lengths in years the benchmark runs at
+BENCHMARK_YEARS = [1, 20, 50, 131]
+
+# first year of the benchmarked calendars
+BENCHMARK_START_YEAR = 1970
+
+# holiday rule tables - the shipped CZ rules and a large synthetic table (see getLargeRules)
+RULE_TABLES = {'small': 'CZ', 'large': 'BENCHMARK_LARGE'}
+
+# timed stages, total is createCalendar end to end
+STAGES = [
+    'total',
+    'date_dimension',
+    'week_numbers',
+    'holidays',
+    'workdays',
+    'period_boundaries',
+    'current_flags',
+    'csv_write']
+
+def getLargeRules(fixed_rules:int=2000, easter_rules:int=100)->pd.DataFrame:
+    """
+    Large holiday rule table - the CZ rules followed by synthetic rules.
+
+    Every synthetic rule is valid for one year only, so the calendar keeps
+    about as many workdays as with the CZ rules while the matching works
+    through the whole table.
+    """
+    days = pd.date_range('2000-01-01', '2000-12-31', freq='D')
+    years = BENCHMARK_YEARS[-1]
+
+    rules = list()
+    for i in range(fixed_rules):
+        day = days[i * 7 % len(days)]
+        year = BENCHMARK_START_YEAR + i % years
+        rules.append(['fixed', day.month, day.day, None, f'Fixed holiday {i}', f'{year}-01-01', f'{year}-12-31'])
+    for i in range(easter_rules):
+        year = BENCHMARK_START_YEAR + i % years
+        rules.append(['easter', None, None, i % 81 - 40, f'Easter holiday {i}', f'{year}-01-01', f'{year}-12-31'])
+
+    large_rules = pd.DataFrame(data=rules, columns=holidays_udfs.RULE_COLUMNS)
+
+    return pd.concat([holidays_udfs.getRules('CZ'), large_rules], ignore_index=True)
+
+def addWeekNumbers(df:pd.DataFrame, engine:str)->pd.DataFrame:
+    """
+    Week number in year and in month (build steps week_numbers and week_month).
+    """
+    df = create_calendar.addWeekNumbers(df, engine, None)
+
+    return create_calendar.addWeekMonth(df, engine, None)
+
+def addPeriodBoundaries(df:pd.DataFrame, engine:str)->pd.DataFrame:
+    """
+    First and last day in year, quarter, month and week (build steps *_boundaries).
+    """
+    df = create_calendar.addYearBoundaries(df, engine, None)
+    df = create_calendar.addQuarterBoundaries(df, engine, None)
+    df = create_calendar.addMonthBoundaries(df, engine, None)
+
+    return create_calendar.addWeekBoundaries(df, engine, None)
+
+def timeStage(stage, setup, repeat:int)->list:
+    """
+    Run a stage repeatedly, the setup is not timed.
+
+    Args:
+        stage (function): timed function taking the arguments returned by setup
+        setup (function): returns a tuple of fresh stage arguments for every run
+        repeat (int): number of runs
+
+    Returns:
+        list: run times in seconds
+    """
+    times = list()
+    for _ in range(repeat):
+        args = setup()
+        start = time.perf_counter()
+        stage(*args)
+        times.append(time.perf_counter() - start)
+
+    return times
+
+def benchmarkCalendar(for_years:int, rules:str, engine:str='vectorized', repeat:int=3)->list:
+    """
+    Time createCalendar and its stages for one calendar length and rule table.
+
+    Args:
+        for_years (int): number of years of the calendar
+        rules (str): rule table, key of RULE_TABLES
+        engine (str): 'vectorized' or 'apply', see createCalendar
+        repeat (int): number of runs of every stage
+
+    Returns:
+        list: one result dict per stage
+    """
+    region = RULE_TABLES[rules]
+    start_year = BENCHMARK_START_YEAR
+
+    # stage inputs, each built by the previous stages
+    df_dates = create_calendar.createDateDimension(start_year, for_years, engine)
+    df_base = df_dates.drop(columns=['w', 'iso_w', 'week_month'])
+    df_holidays = holidays_udfs.Holidays(df_dates.copy(), region).insertHolidays()
+    df_calendar = create_calendar.createCalendar(start_year, for_years, engine, region=region)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = os.path.join(tmp_dir, 'calendar.csv')
+
+        stages = {
+            'total': (lambda: create_calendar.createCalendar(start_year, for_years, engine, region=region), lambda: ()),
+            'date_dimension': (lambda: create_calendar.createDateDimension(start_year, for_years, engine), lambda: ()),
+            'week_numbers': (addWeekNumbers, lambda: (df_base.copy(), engine)),
+            'holidays': (lambda df: holidays_udfs.Holidays(df, region).insertHolidays(), lambda: (df_dates.copy(),)),
+            'workdays': (create_calendar.addWorkdays, lambda: (df_holidays.copy(), engine)),
+            'period_boundaries': (addPeriodBoundaries, lambda: (df_dates.copy(), engine)),
+            'current_flags': (create_calendar.addCurrentPeriodFlags, lambda: (df_calendar.copy(), engine)),
+            'csv_write': (io_udfs.writeCalendar, lambda: (df_calendar, csv_path, 'csv')),
+        }
+
+        results = list()
+        for stage in STAGES:
+            times = timeStage(*stages[stage], repeat)
+            results.append({
+                'years': for_years,
+                'rules': rules,
+                'engine': engine,
+                'stage': stage,
+                'rows': len(df_calendar),
+                'best': min(times),
+                'median': statistics.median(times),
+                'times': times})
+
+    return results
+
+def runBenchmarks(years:list, rule_tables:list, engine:str='vectorized', repeat:int=3, log=print)->dict:
+    """
+    Run the benchmark for all combinations of calendar lengths and rule tables.
+
+    Returns:
+        dict: machine-readable results with the environment in meta
+    """
+    holidays_udfs.registerRules(RULE_TABLES['large'], getLargeRules())
+
+    results = list()
+    for for_years in years:
+        for rules in rule_tables:
+            results.extend(benchmarkCalendar(for_years, rules, engine, repeat))
+            log(f'{for_years} years, {rules} rules: total {results[-len(STAGES)]["best"]:.3f} s')
+
+    return {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'start_year': BENCHMARK_START_YEAR,
+            'engine': engine,
+            'repeat': repeat},
+        'results': results}
+
+def compareResults(results:dict, baseline:dict, threshold:float=0.2, min_seconds:float=0.005)->list:
+    """
+    Compare best times against a baseline.
+
+    A stage regressed when it is slower than the baseline by more than the
+    threshold (relative) and by more than min_seconds (absolute, filters out
+    noise of the fastest stages).
+
+    Returns:
+        list: one dict per stage found in both results with baseline, current, ratio and status
+    """
+    key = lambda result: (result['years'], result['rules'], result['engine'], result['stage'])
+    baseline_best = {key(result): result['best'] for result in baseline['results']}
+
+    comparison = list()
+    for result in results['results']:
+        if key(result) not in baseline_best:
+            continue
+
+        before = baseline_best[key(result)]
+        ratio = result['best'] / before if before > 0 else float('inf')
+
+        if ratio > 1 + threshold and result['best'] - before > min_seconds:
+            status = 'regression'
+        elif ratio < 1 - threshold and before - result['best'] > min_seconds:
+            status = 'improvement'
+        else:
+            status = 'ok'
+
+        comparison.append(dict(zip(['years', 'rules', 'engine', 'stage'], key(result)), baseline=before, current=result['best'], ratio=ratio, status=status))
+
+    return comparison
+
+def printComparison(comparison:list):
+    """
+    Print the comparison against the baseline as a table.
+    """
+    print(f'{"years":>5} {"rules":<6} {"stage":<18} {"baseline":>10} {"current":>10} {"ratio":>7}  status')
+    for row in comparison:
+        print(f'{row["years"]:>5} {row["rules"]:<6} {row["stage"]:<18} {row["baseline"]:>10.4f} {row["current"]:>10.4f} {row["ratio"]:>7.2f}  {row["status"]}')
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark calendar generation stages.')
+    parser.add_argument('--years', type=int, nargs='+', default=BENCHMARK_YEARS, help='calendar lengths in years')
+    parser.add_argument('--rules', nargs='+', choices=list(RULE_TABLES), default=list(RULE_TABLES), help='holiday rule tables')
+    parser.add_argument('--engine', choices=['vectorized', 'apply'], default='vectorized', help='column engine of createCalendar')
+    parser.add_argument('--repeat', type=int, default=3, help='number of runs of every stage, the best one is compared')
+    parser.add_argument('--output', default='benchmark.json', help='JSON file with the results')
+    parser.add_argument('--compare', metavar='BASELINE', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='relative slowdown reported as a regression')
+    args = parser.parse_args()
+
+    results = runBenchmarks(args.years, args.rules, args.engine, args.repeat)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+        comparison = compareResults(results, baseline, args.threshold)
+        printComparison(comparison)
+
+        if any(row['status'] == 'regression' for row in comparison):
+            sys.exit(1)
@@ -0,0 +1,287 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+# pandas, numpy and the calendar modules are imported only when a command needs them,
+# so that --help and argument errors return without loading them
+
+# keys of a job in the job file, start_year and for_years are required
+JOB_KEYS = ['start_year', 'for_years', 'region', 'columns', 'format', 'output', 'compression']
+
+def getParser()->argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Create calendar table.')
+    parser.add_argument('--start-year', type=int, help='year when the calendar starts (1970 - 2100)')
+    parser.add_argument('--for-years', type=int, help='number of years to create the calendar for')
+    parser.add_argument('--jobs', metavar='FILE', help='run the jobs of a JSON job file in one process, see README (other build options are ignored)')
+    parser.add_argument('--format', help='output format csv, parquet, feather or npz (parquet and feather need pyarrow), csv by default')
+    parser.add_argument('--output', help='output file, calendar.<format> by default (calendar.csv.gz with --compression gzip)')
+    parser.add_argument('--compression', help='compression passed to the writer, e.g. gzip, snappy, zstd or lz4 (a csv compression must match the --output extension)')
+    parser.add_argument('--workers', type=int, default=1, help='number of processes building blocks of years in parallel')
+    parser.add_argument('--regions', default='CZ', help='comma separated holiday rules regions, see holiday_rules/ (CZ by default)')
+    parser.add_argument('--per-region', action='store_true', help='with more regions write one file per region instead of one long table')
+    parser.add_argument('--chunk-years', type=int, help='build and write the calendar in chunks of this many years with bounded memory')
+    parser.add_argument('--refresh', metavar='CALENDAR', help='only refresh the current period flags of an existing calendar file')
+    parser.add_argument('--as-of', help='date the current period flags are computed for (YYYY-MM-DD), today by default')
+    parser.add_argument('--changed', choices=['all', 'columns', 'rows'], default='all',
+        help='with --refresh write the whole calendar (back to CALENDAR by default), only date_key with the refreshed columns, '
+            'or only the rows with changed flags (to CALENDAR_flags by default)')
+    parser.add_argument('--columns', help='comma separated columns to create (with the columns they are computed from), all by default')
+    parser.add_argument('--cache', nargs='?', const='', metavar='DIR',
+        help='reuse calendars cached in DIR (~/.cache/calendar-python or $CALENDAR_CACHE_DIR by default), only the current period flags are recomputed')
+    parser.add_argument('--clear-cache', action='store_true', help='remove the cached calendars of the --regions (all with --regions all) and exit')
+    parser.add_argument('--sql', metavar='DATABASE', help='load the calendar to a table of this SQLite database instead of writing a file')
+    parser.add_argument('--table', default='calendar', help='SQL table name, with --per-region suffixed by the region (calendar by default)')
+    parser.add_argument('--sql-mode', default='replace',
+        help='replace the table, or upsert to insert new and update existing rows by date_key (replace by default, --refresh always upserts)')
+    parser.add_argument('--validate', metavar='CALENDAR', help='validate an existing calendar file against the holiday rules of the first --regions and exit')
+    parser.add_argument('--diff', metavar='PREVIOUS', help='write only the rows inserted, updated or deleted since the PREVIOUS calendar file')
+    parser.add_argument('--diff-ignore', help='comma separated columns not compared by --diff (created by default)')
+    parser.add_argument('--profile', action='store_true', help='print wall time, rows and peak memory of the build stages')
+
+    return parser
+
+def readJobs(path)->list:
+    """
+    Read and validate the jobs of a job file.
+
+    The job file is a JSON list of objects with the keys start_year and
+    for_years and optionally region (CZ by default), columns (list or comma
+    separated, all by default), format, output and compression.
+
+    Returns:
+        list: jobs as dicts with all JOB_KEYS, columns as a list or None and output set
+    """
+    import create_calendar
+    from udfs import holidays_udfs, io_udfs, validation_udfs
+
+    with open(path) as f:
+        jobs = json.load(f)
+
+    if not isinstance(jobs, list) or not all(isinstance(job, dict) for job in jobs):
+        raise ValueError('Job file must contain a list of job objects')
+
+    valid_jobs = list()
+    for i, job in enumerate(jobs):
+        unknown_keys = [key for key in job if key not in JOB_KEYS]
+        if unknown_keys or 'start_year' not in job or 'for_years' not in job:
+            raise ValueError(f'Job {i} must have start_year and for_years and only the keys {JOB_KEYS}')
+
+        job = dict({'region': 'CZ', 'columns': None, 'format': None, 'output': None, 'compression': None}, **job)
+        validation_udfs.validStartYear(job['start_year'])
+        validation_udfs.validForYears(job['for_years'])
+
+        if job['region'] not in holidays_udfs.getRegions():
+            raise ValueError(f'Job {i} has unknown region {job["region"]}, available regions: {holidays_udfs.getRegions()}')
+
+        if isinstance(job['columns'], str):
+            job['columns'] = job['columns'].split(',')
+        if job['columns'] is not None:
+            validation_udfs.validColumns(job['columns'], create_calendar.CALENDAR_COLUMNS)
+
+        if job['output'] is None:
+            job['output'] = f'calendar_{job["region"]}_{job["start_year"]}_{job["for_years"]}{io_udfs.getExtension(job["format"], job["compression"])}'
+        job['format'] = io_udfs.getOutputFormat(job['output'], job['format'], job['compression'])
+
+        valid_jobs.append(job)
+
+    outputs = [job['output'] for job in valid_jobs]
+    if len(set(outputs)) != len(outputs):
+        raise ValueError('Jobs must write to different outputs')
+
+    return valid_jobs
+
+def runJobs(jobs:list, log=print)->list:
+    """
+    Run jobs in one process.
+
+    The calendars of all regions are built once over the range covering
+    all jobs (with the date dimension shared by the regions) and every job
+    cuts its years out of them with sliceCalendar, which gives the same
+    calendar as building the job alone.
+
+    Args:
+        jobs (list): jobs from readJobs
+        log (function): called with a progress message after the build and every job
+
+    Returns:
+        list: one dict per job with output, rows and seconds, the shared build first
+    """
+    import create_calendar
+    from udfs import io_udfs
+
+    start_year = min(job['start_year'] for job in jobs)
+    end_year = max(job['start_year'] + job['for_years'] for job in jobs)
+    regions = list(dict.fromkeys(job['region'] for job in jobs))
+
+    start = time.perf_counter()
+    calendars = create_calendar.createRegionalCalendars(start_year, end_year - start_year, regions)
+    timings = [{'output': None, 'rows': sum(len(df) for df in calendars.values()), 'seconds': time.perf_counter() - start}]
+    log(f'shared build {", ".join(regions)} {start_year} - {end_year - 1}: {timings[-1]["rows"]} rows, {timings[-1]["seconds"]:.3f} s')
+
+    for job in jobs:
+        start = time.perf_counter()
+
+        df = create_calendar.sliceCalendar(calendars[job['region']], job['start_year'], job['for_years'])
+        df = df[[column for column in create_calendar.CALENDAR_COLUMNS if job['columns'] is None or column in job['columns']]]
+        io_udfs.writeCalendar(df, job['output'], job['format'], job['compression'])
+
+        timings.append({'output': job['output'], 'rows': len(df), 'seconds': time.perf_counter() - start})
+        log(f'{job["output"]}: {timings[-1]["rows"]} rows, {timings[-1]["seconds"]:.3f} s')
+
+    return timings
+
+def run(args, parser:argparse.ArgumentParser):
+    """
+    Run the command given by the parsed arguments.
+    """
+    if args.clear_cache:
+        from udfs import cache_udfs
+
+        cache = cache_udfs.CalendarCache(args.cache or None)
+        for region in ([None] if args.regions == 'all' else args.regions.split(',')):
+            cache.invalidate(region)
+        return
+
+    if args.jobs is None and not (args.refresh or args.validate) and (args.start_year is None or args.for_years is None):
+        parser.error('--start-year and --for-years are required (or --jobs, --refresh, --validate or --clear-cache)')
+
+    import create_calendar
+    from udfs import df_udfs, holidays_udfs, io_udfs, profile_udfs, validation_udfs
+
+    profiler = profile_udfs.Profiler() if args.profile else None
+
+    if args.jobs:
+        with profile_udfs.profiling(profiler):
+            start = time.perf_counter()
+            timings = runJobs(readJobs(args.jobs))
+            print(f'{len(timings) - 1} jobs, {time.perf_counter() - start:.3f} s')
+
+        if profiler is not None:
+            print(profiler.getTable())
+        return
+
+    regions = list(dict.fromkeys(args.regions.split(',')))
+    unknown_regions = [region for region in regions if region not in holidays_udfs.getRegions()]
+    if unknown_regions:
+        parser.error(f'unknown regions {unknown_regions}, available regions: {holidays_udfs.getRegions()}')
+
+    columns = args.columns.split(',') if args.columns else None
+    if columns is not None and not set(columns) <= set(create_calendar.CALENDAR_COLUMNS):
+        parser.error(f'unknown columns {sorted(set(columns) - set(create_calendar.CALENDAR_COLUMNS))}')
+    selected_columns = [column for column in create_calendar.CALENDAR_COLUMNS if columns is None or column in columns]
+
+    if args.sql and len(regions) > 1 and not args.per_region:
+        parser.error('--sql with more regions needs --per-region (date_key is unique only within a region)')
+
+    if args.diff and (args.sql or args.chunk_years or len(regions) > 1):
+        parser.error('--diff writes a delta file of one calendar, it cannot be combined with --sql, --chunk-years or more regions')
+
+    if args.sql:
+        import sqlite3
+        from contextlib import closing
+        from udfs import sql_udfs
+
+        if args.sql_mode not in sql_udfs.LOAD_MODES:
+            parser.error(f'--sql-mode must be one of {sql_udfs.LOAD_MODES}')
+
+    if args.validate:
+        report = validation_udfs.validateCalendarFile(args.validate, args.format, regions[0])
+        print(validation_udfs.getReportTable(report))
+        sys.exit(0 if report['valid'] else 1)
+
+    if args.refresh:
+        # only the whole calendar is written back, the changed flags go to <name>_flags.<ext> by default
+        output = args.output
+        if output is None:
+            output_root, output_ext = io_udfs.splitExtension(args.refresh)
+            output = args.refresh if args.changed == 'all' else f'{output_root}_flags{output_ext}'
+        elif args.changed != 'all' and os.path.abspath(output) == os.path.abspath(args.refresh):
+            parser.error('--changed rows or columns cannot overwrite the --refresh calendar, use another --output')
+        if not args.sql:
+            io_udfs.getOutputFormat(output, args.format, args.compression)
+
+        with profile_udfs.profiling(profiler):
+            df = io_udfs.readCalendar(args.refresh)
+            previous_flags = df[create_calendar.CURRENT_PERIOD_COLUMNS].copy()
+
+            df = create_calendar.refreshCurrentFlags(df, args.as_of)
+
+            if args.changed != 'all':
+                changed_rows = (df[create_calendar.CURRENT_PERIOD_COLUMNS] != previous_flags).any(axis=1)
+                df = df[['date_key'] + create_calendar.CURRENT_PERIOD_COLUMNS + ['created']]
+                if args.changed == 'rows':
+                    df = df.loc[changed_rows]
+
+            if args.sql:
+                with closing(sqlite3.connect(args.sql)) as connection:
+                    sql_udfs.loadCalendar(df, connection, args.table, 'upsert')
+            else:
+                io_udfs.writeCalendar(df, output, args.format, args.compression)
+
+        if profiler is not None:
+            print(profiler.getTable())
+        return
+
+    validation_udfs.validStartYear(args.start_year)
+    validation_udfs.validForYears(args.for_years)
+    start_year, for_years = args.start_year, args.for_years
+
+    output = args.output or f'calendar{"_delta" if args.diff else ""}{io_udfs.getExtension(args.format, args.compression)}'
+    io_udfs.getOutputFormat(output, args.format, args.compression, chunked=bool(args.chunk_years) and not args.sql)
+
+    with profile_udfs.profiling(profiler):
+        if len(regions) > 1:
+            calendars = {region: df[selected_columns] for region, df in create_calendar.createRegionalCalendars(start_year, for_years, regions).items()}
+            if args.per_region:
+                output_root, output_ext = io_udfs.splitExtension(output)
+                for region, df in calendars.items():
+                    if args.sql:
+                        with closing(sqlite3.connect(args.sql)) as connection:
+                            sql_udfs.loadCalendar(df, connection, f'{args.table}_{region}', args.sql_mode)
+                    else:
+                        io_udfs.writeCalendar(df, f'{output_root}_{region}{output_ext}', args.format, args.compression)
+            else:
+                io_udfs.writeCalendar(df_udfs.toLongTable(calendars), output, args.format, args.compression)
+        elif args.chunk_years:
+            chunks = (df[selected_columns] for df in create_calendar.generateCalendar(start_year, for_years, args.chunk_years, region=regions[0]))
+            if args.sql:
+                with closing(sqlite3.connect(args.sql)) as connection:
+                    sql_udfs.loadCalendarChunks(chunks, connection, args.table, args.sql_mode)
+            else:
+                io_udfs.writeCalendarChunks(chunks, output, args.format, args.compression)
+        else:
+            cache = None
+            if args.cache is not None:
+                from udfs import cache_udfs
+                cache = cache_udfs.CalendarCache(args.cache or None)
+
+            df = create_calendar.createCalendar(start_year, for_years, workers=args.workers, region=regions[0], columns=columns, cache=cache)
+            if args.diff:
+                from udfs import delta_udfs
+
+                ignore_columns = args.diff_ignore.split(',') if args.diff_ignore else delta_udfs.DELTA_IGNORED_COLUMNS
+                df = delta_udfs.getCalendarDelta(io_udfs.readCalendar(args.diff), df, ignore_columns)
+                print(delta_udfs.getDeltaSummary(df))
+            if args.sql:
+                with closing(sqlite3.connect(args.sql)) as connection:
+                    sql_udfs.loadCalendar(df, connection, args.table, args.sql_mode)
+            else:
+                io_udfs.writeCalendar(df, output, args.format, args.compression)
+
+    if profiler is not None:
+        print(profiler.getTable())
+
+def main(argv:list=None):
+    parser = getParser()
+    args = parser.parse_args(argv)
+
+    try:
+        run(args, parser)
+    except ValueError as e:
+        parser.error(str(e))
+
+if __name__ == '__main__':
+
+    main()
@@ -0,0 +1,394 @@
+import argparse
+import asyncio
+import bisect
+import json
+import re
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit, parse_qs
+import numpy as np
+import pandas as pd
+import create_calendar
+from udfs import df_udfs, io_udfs, vectorized_udfs
+
+# fields answered by the lookups
+LOOKUP_FIELDS = ['pwd', 'nwd', 'workday_number', 'holiday_name', 'is_report_day']
+
+# calendar columns the lookups are built from
+LOOKUP_COLUMNS = ['full_date', 'pwd', 'nwd', 'workday_date', 'workday_number', 'holiday_name']
+
+# upper bounds of the latency histogram buckets in milliseconds
+LATENCY_BUCKETS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, float('inf')]
+
+# most dates of one batch lookup
+MAX_BATCH_DATES = 100000
+
+# largest accepted request body in bytes
+MAX_BODY_BYTES = 4 * 2**20
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# format of the looked up dates
+DATE_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+# reason phrases of the returned status codes
+HTTP_STATUSES = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large',
+    500: 'Internal Server Error'}
+
+class RequestError(ValueError):
+    """Invalid lookup request, returned to the client with the status code."""
+
+    def __init__(self, message:str, status:int=400):
+        super().__init__(message)
+        self.status = status
+
+class CalendarLookup:
+    """
+    Array-backed lookups of calendar days.
+
+    The calendar is kept as numpy arrays indexed by days since its first day,
+    so a lookup of any number of dates is an index into the arrays. The report
+    day flag depends on the current date, refresh computes it for a new date
+    and swaps it in with one assignment - a lookup running meanwhile sees
+    either the old or the new flags, never a mix.
+    """
+
+    def __init__(self, df:pd.DataFrame, as_of=None):
+        """
+        Args:
+            df (DataFrame): calendar created by createCalendar or read by io_udfs.readCalendar (also compact)
+            as_of (date): date the report day is computed for, today by default
+        """
+        df = df_udfs.expandCalendar(df[LOOKUP_COLUMNS])
+        days = vectorized_udfs.toEpochDays(df['full_date'])
+
+        if len(days) == 0 or np.any(np.diff(days) != 1):
+            raise ValueError('Calendar must contain consecutive days')
+
+        self.df = df
+        self.first_day = int(days[0])
+        self.last_day = int(days[-1])
+        self.pwd = df['pwd'].to_numpy(dtype='datetime64[D]')
+        self.nwd = df['nwd'].to_numpy(dtype='datetime64[D]')
+        self.workday_number = df['workday_number'].to_numpy(dtype=np.int64)
+        self.holiday_name = df['holiday_name'].to_numpy(dtype=object)
+        self.flags = None
+
+        self.refresh(as_of)
+
+    def getReportDays(self, as_of=None)->tuple:
+        """
+        Report day flags for a date.
+
+        Returns:
+            tuple: (date, flags) - the date the flags are computed for and a bool array
+        """
+        current_date = pd.Timestamp.now().normalize() if as_of is None else pd.Timestamp(as_of)
+
+        return current_date.date(), vectorized_udfs.getReportDays(self.df, current_date).astype(bool)
+
+    def refresh(self, as_of=None):
+        """
+        Recompute the report day flags and swap them in atomically.
+        """
+        self.flags = self.getReportDays(as_of)
+
+    def lookup(self, dates:list, fields:list=None)->list:
+        """
+        Look up calendar days.
+
+        Args:
+            dates (list): dates as YYYY-MM-DD strings
+            fields (list): fields of LOOKUP_FIELDS to return, all by default
+
+        Returns:
+            list: one dict per date with the date and the fields, dates outside of the calendar have an error instead
+        """
+        fields = LOOKUP_FIELDS if fields is None else fields
+        if not isinstance(fields, list) or not all(isinstance(field, str) for field in fields):
+            raise RequestError('Fields must be a list of field names')
+        unknown_fields = [field for field in fields if field not in LOOKUP_FIELDS]
+        if unknown_fields:
+            raise RequestError(f'Unknown fields {unknown_fields}, use {LOOKUP_FIELDS}')
+
+        # numpy would also take numbers as days since epoch and cut off times
+        if not all(isinstance(date, str) and DATE_PATTERN.fullmatch(date) for date in dates):
+            raise RequestError('Dates must be in the format YYYY-MM-DD')
+
+        try:
+            days = np.array(dates, dtype='datetime64[D]')
+        except ValueError:
+            raise RequestError('Dates must be in the format YYYY-MM-DD')
+        if days.ndim != 1 or np.isnat(days).any():
+            raise RequestError('Dates must be in the format YYYY-MM-DD')
+
+        # one read of the flags, refresh may replace them during the lookup
+        _, report_days = self.flags
+
+        positions = days.astype(np.int64) - self.first_day
+        in_calendar = (positions >= 0) & (positions <= self.last_day - self.first_day)
+        positions = np.where(in_calendar, positions, 0)
+
+        columns = {
+            'pwd': lambda: np.datetime_as_string(self.pwd[positions]).tolist(),
+            'nwd': lambda: np.datetime_as_string(self.nwd[positions]).tolist(),
+            'workday_number': lambda: self.workday_number[positions].tolist(),
+            'holiday_name': lambda: self.holiday_name[positions].tolist(),
+            'is_report_day': lambda: report_days[positions].tolist()}
+        values = {field: columns[field]() for field in fields}
+
+        results = list()
+        for i, day in enumerate(np.datetime_as_string(days).tolist()):
+            if in_calendar[i]:
+                result = {'date': day}
+                for field in fields:
+                    value = values[field][i]
+                    result[field] = None if value == 'NaT' else value
+            else:
+                result = {'date': day, 'error': 'not in calendar'}
+            results.append(result)
+
+        return results
+
+    def getInfo(self)->dict:
+        """
+        Range of the calendar and the date of the report day flags.
+        """
+        as_of, _ = self.flags
+
+        return {
+            'first_date': str(np.datetime64(self.first_day, 'D')),
+            'last_date': str(np.datetime64(self.last_day, 'D')),
+            'days': self.last_day - self.first_day + 1,
+            'as_of': as_of.isoformat()}
+
+class ServiceMetrics:
+    """
+    Request counters and latency histograms per endpoint.
+    """
+
+    def __init__(self, buckets:list=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.started = time.time()
+        self.requests = dict()
+        self.dates = 0
+        self.latencies = dict()
+
+    def observe(self, endpoint:str, status:int, seconds:float, dates:int=0):
+        """
+        Count a handled request and its latency.
+        """
+        counts = self.requests.setdefault(endpoint, dict())
+        counts[status] = counts.get(status, 0) + 1
+        self.dates += dates
+
+        histogram = self.latencies.setdefault(endpoint, {'counts': [0] * len(self.buckets), 'sum': 0.0})
+        milliseconds = seconds * 1000
+        histogram['counts'][bisect.bisect_left(self.buckets, milliseconds)] += 1
+        histogram['sum'] += milliseconds
+
+    def toDict(self)->dict:
+        """
+        Metrics as a JSON serializable dict, histogram buckets are labeled by their upper bound in ms.
+        """
+        labels = [str(bucket) if bucket != float('inf') else '+Inf' for bucket in self.buckets]
+
+        return {
+            'uptime_seconds': time.time() - self.started,
+            'requests': {endpoint: {str(status): count for status, count in counts.items()} for endpoint, counts in self.requests.items()},
+            'dates_looked_up': self.dates,
+            'latency_ms': {
+                endpoint: {'buckets': dict(zip(labels, histogram['counts'])), 'count': sum(histogram['counts']), 'sum': histogram['sum']}
+                for endpoint, histogram in self.latencies.items()}}
+
+class CalendarService:
+    """
+    Asyncio HTTP service answering calendar lookups.
+
+    Endpoints (JSON responses, HTTP/1.1 with keep-alive):
+        GET /lookup?date=2024-05-02&fields=pwd,nwd       single date
+        GET /lookup?dates=2024-05-02,2024-05-03          batch
+        POST /lookup {"dates": [...], "fields": [...]}   batch
+        GET /health                                      calendar range and date of the flags
+        GET /metrics                                     request counters and latency histograms
+    """
+
+    def __init__(self, lookup:CalendarLookup, host:str=DEFAULT_HOST, port:int=DEFAULT_PORT, reload:bool=True):
+        """
+        Args:
+            lookup (CalendarLookup): calendar to answer from
+            host (str): address to listen on, localhost by default
+            port (int): port to listen on, 0 for any free port
+            reload (bool): refresh the report day flags after every midnight
+        """
+        self.lookup = lookup
+        self.host = host
+        self.port = port
+        self.reload = reload
+        self.metrics = ServiceMetrics()
+        self.server = None
+        self.reload_task = None
+
+    async def start(self):
+        """
+        Start listening, the bound port is in self.port.
+        """
+        self.server = await asyncio.start_server(self.handleConnection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+        if self.reload:
+            self.reload_task = asyncio.create_task(self.reloadAtMidnight())
+
+    async def stop(self):
+        if self.reload_task is not None:
+            self.reload_task.cancel()
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def serveForever(self):
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def reloadAtMidnight(self):
+        """
+        Refresh the report day flags after every midnight, the flags are computed
+        in a thread and swapped in, so requests are answered meanwhile.
+        """
+        loop = asyncio.get_running_loop()
+
+        while True:
+            now = datetime.now()
+            midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+            await asyncio.sleep((midnight - now).total_seconds())
+
+            flags = await loop.run_in_executor(None, self.lookup.getReportDays, midnight.date())
+            self.lookup.flags = flags
+
+    def handleRequest(self, method:str, target:str, body:bytes)->tuple:
+        """
+        Answer one request.
+
+        Returns:
+            tuple: (endpoint, status, JSON serializable response, number of looked up dates)
+        """
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        endpoint = url.path.rstrip('/') or '/'
+
+        if endpoint not in ['/lookup', '/health', '/metrics']:
+            return 'other', 404, {'error': f'Unknown endpoint {endpoint}'}, 0
+        if method not in (['GET', 'POST'] if endpoint == '/lookup' else ['GET']):
+            return endpoint, 405, {'error': f'Method {method} not allowed'}, 0
+
+        if endpoint == '/health':
+            return endpoint, 200, dict(status='ok', **self.lookup.getInfo()), 0
+        if endpoint == '/metrics':
+            return endpoint, 200, self.metrics.toDict(), 0
+
+        try:
+            fields = query['fields'][0].split(',') if 'fields' in query else None
+
+            if method == 'POST':
+                try:
+                    request = json.loads(body)
+                    dates = request['dates']
+                    fields = request.get('fields', fields)
+                except (ValueError, TypeError, KeyError):
+                    raise RequestError('Body must be a JSON object with a list of dates')
+            elif 'date' in query:
+                result = self.lookup.lookup([query['date'][0]], fields)[0]
+                return endpoint, 404 if 'error' in result else 200, result, 1
+            elif 'dates' in query:
+                dates = query['dates'][0].split(',')
+            else:
+                raise RequestError('Parameter date or dates is required')
+
+            if not isinstance(dates, list) or len(dates) > MAX_BATCH_DATES:
+                raise RequestError(f'Dates must be a list of at most {MAX_BATCH_DATES} dates')
+
+            return endpoint, 200, {'results': self.lookup.lookup(dates, fields)}, len(dates)
+        except RequestError as e:
+            return endpoint, e.status, {'error': str(e)}, 0
+
+    async def handleConnection(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter):
+        """
+        Serve the requests of one connection until the client closes it.
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                headers = dict()
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                start = time.perf_counter()
+                keep_alive = headers.get('connection', '').lower() != 'close'
+
+                try:
+                    method, target, _ = request_line.decode('latin-1').split()
+                    length = int(headers.get('content-length', 0))
+                    if length < 0:
+                        raise ValueError('Negative Content-Length')
+                except ValueError:
+                    endpoint, status, response, dates = 'other', 400, {'error': 'Malformed request'}, 0
+                    keep_alive = False
+                else:
+                    if length > MAX_BODY_BYTES:
+                        endpoint, status, response, dates = 'other', 413, {'error': 'Request body too large'}, 0
+                        keep_alive = False
+                    else:
+                        body = await reader.readexactly(length) if length else b''
+                        try:
+                            endpoint, status, response, dates = self.handleRequest(method, target, body)
+                        except Exception:
+                            endpoint, status, response, dates = 'other', 500, {'error': 'Internal server error'}, 0
+
+                payload = json.dumps(response).encode()
+                writer.write(
+                    f'HTTP/1.1 {status} {HTTP_STATUSES[status]}\r\n'
+                    f'Content-Type: application/json\r\n'
+                    f'Content-Length: {len(payload)}\r\n'
+                    f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'.encode() + payload)
+                await writer.drain()
+
+                self.metrics.observe(endpoint, status, time.perf_counter() - start, dates)
+
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Serve calendar lookups over HTTP.')
+    parser.add_argument('--calendar', help='calendar file to serve (see io_udfs.FORMATS), otherwise it is created')
+    parser.add_argument('--start-year', type=int, default=datetime.now().year - 10, help='first year of the created calendar')
+    parser.add_argument('--for-years', type=int, default=21, help='number of years of the created calendar')
+    parser.add_argument('--region', default='CZ', help='holiday rules region of the created calendar')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='address to listen on, localhost by default')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='port to listen on')
+    args = parser.parse_args()
+
+    if args.calendar:
+        df = io_udfs.readCalendar(args.calendar)
+    else:
+        df = create_calendar.createCalendar(args.start_year, args.for_years, region=args.region, columns=LOOKUP_COLUMNS)
+
+    service = CalendarService(CalendarLookup(df), args.host, args.port)
+    print(f'Serving {service.lookup.getInfo()["days"]} days on http://{args.host}:{args.port}')
+
+    try:
+        asyncio.run(service.serveForever())
+    except KeyboardInterrupt:
+        pass
@@ -1,15 +1,66 @@
+import graphlib
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 from datetime import datetime, timedelta, date
 from dateutil.relativedelta import relativedelta
 import numpy as np
-from udfs import date_udfs, validation_udfs, df_udfs, holidays_udfs
-
-def createCalendar(start_year:int, for_years:int)->pd.DataFrame:
+from udfs import date_udfs, validation_udfs, df_udfs, holidays_udfs, vectorized_udfs, io_udfs, profile_udfs
+
+# columns of the calendar in the output order
+CALENDAR_COLUMNS = [
+    'date_key', 'full_date', 'y', 'm', 'd', 'day_suffix', 'year_month', 'wkd', 'wkd_name', 'month_name',
+    'q', 'year_quarter', 'day_year', 'w', 'iso_w', 'week_month', 'is_weekend', 'is_weekday',
+    'previous_weekday', 'next_weekday', 'is_holiday', 'holiday_name', 'is_workday', 'workday_id',
+    'workday_date', 'workday_number', 'pwd', 'nwd', 'first_workday_in_month', 'last_workday_in_month',
+    'first_day_year', 'first_day_quarter', 'first_day_month', 'first_day_week',
+    'last_day_year', 'last_day_quarter', 'last_day_month', 'last_day_week',
+    'previous_day', 'next_day', 'previous_year_month', 'next_year_month',
+    'previous_quarter', 'next_quarter', 'previous_year', 'next_year',
+    'is_today', 'is_report_day', 'is_current_week', 'is_current_month', 'is_current_quarter', 'is_current_year',
+    'created']
+
+# columns changing from day to day
+CURRENT_PERIOD_COLUMNS = [
+    'is_today',
+    'is_report_day',
+    'is_current_week',
+    'is_current_month',
+    'is_current_quarter',
+    'is_current_year']
+
+# columns depending on the holiday rules of a region
+WORKDAY_COLUMNS = [
+    'is_holiday',
+    'holiday_name',
+    'is_workday',
+    'workday_id',
+    'workday_date',
+    'workday_number',
+    'pwd',
+    'nwd',
+    'first_workday_in_month',
+    'last_workday_in_month']
+
+@profile_udfs.profiled('createCalendar')
+def createCalendar(start_year:int, for_years:int, engine:str='vectorized', compact:bool=False, epoch_dates:bool=False, workers:int=1, region:str='CZ', profiler=None, columns:list=None, cache=None)->pd.DataFrame:
     """Create calendar for given years.
 
     Args:
         start_year (int): year when the calendar starts
         for_years (int): number of years to create the calendar for
+        engine (str): 'vectorized' computes the columns with array operations,
+            'apply' uses the row-wise date_udfs functions (reference implementation)
+        compact (bool): return the compact schema with small integer types and
+            categoricals (see df_udfs.compactCalendar, df_udfs.expandCalendar converts it back)
+        epoch_dates (bool): in the compact schema store dates as int32 days since 1970-01-01
+        workers (int): number of processes building blocks of years in parallel (see createCalendarBlocks)
+        region (str): holiday rules region, see holidays_udfs.getRegions
+        profiler (Profiler): collect wall time, rows and peak memory of the build stages
+            into this profile_udfs.Profiler (disabled by default)
+        columns (list): create only these columns (and the columns they are computed
+            from, see COLUMN_DEPENDENCIES), all columns by default
+        cache (CalendarCache): load the deterministic columns from this cache_udfs.CalendarCache
+            and recompute only the current period flags, a missing calendar is created and stored
 
     Returns:
         DataFrame: calendar dataframe with columns:
@@ -67,26 +118,92 @@ def createCalendar(start_year:int, for_years:int)->pd.DataFrame:
             - is_current_year (int): identify current year
             - created (datetime): created date
     """
+    validation_udfs.validEngine(engine)
+    validation_udfs.validWorkers(workers)
+
+    if columns is not None:
+        validation_udfs.validColumns(columns, CALENDAR_COLUMNS)
+
+    if profiler is not None:
+        with profile_udfs.profiling(profiler):
+            return createCalendar(start_year, for_years, engine, compact, epoch_dates, workers, region, columns=columns, cache=cache)
+
+    selected_columns = [column for column in CALENDAR_COLUMNS if columns is None or column in columns]
+
+    if cache is not None:
+        key = cache.getKey(start_year, for_years, region)
+        df = cache.load(key, getColumnDependencies(selected_columns))
+
+        if df is None:
+            df = createCalendar(start_year, for_years, engine, workers=workers, region=region)
+            cache.store(key, df.drop(columns=CURRENT_PERIOD_COLUMNS + ['created']), region)
+
+        # current period flags of the cached calendar
+        df = addColumns(df, selected_columns, engine, region)
+        df['created'] = datetime.now()
+
+        # the selection copies the read-only memory-mapped columns, the calendar can be changed in place
+        df = df[selected_columns]
+
+        return df_udfs.compactCalendar(df, epoch_dates) if compact else df
+
+    if workers > 1 and for_years > 1:
+        # blocks are stitched by the workday columns, the selection is applied to the whole table
+        df = createCalendarBlocks(start_year, for_years, workers, engine, region)[selected_columns]
+        return df_udfs.compactCalendar(df, epoch_dates) if compact else df
+
+    df = getBaseCalendar(start_year, for_years)
+    df = addColumns(df, selected_columns, engine, region)
+
+    # created date
+    if 'created' in selected_columns:
+        df['created'] = datetime.now()
+
+    df = df[selected_columns]
+
+    if compact:
+        df = df_udfs.compactCalendar(df, epoch_dates)
+
+    return df
+
+def getBaseCalendar(start_year:int, for_years:int)->pd.DataFrame:
+    """Calendar with only the columns date_key and full_date for given years."""
     start_date = datetime(start_year, 1, 1)
     end_date = (start_date + relativedelta(years=for_years) - pd.Timedelta(days=1)).date()
 
     # create base dataframe
-    df = pd.DataFrame({
+    return pd.DataFrame({
         'date_key': pd.date_range(start=start_date, end=end_date, freq='D').strftime('%Y%m%d').astype(int),
         'full_date': pd.date_range(start=start_date, end=end_date, freq='D')
     })
 
+def addDateParts(df:pd.DataFrame, engine:str, region:str)->pd.DataFrame:
     # year, month and day as int
     df['y'] = pd.DatetimeIndex(df['full_date']).year
     df['m'] = pd.DatetimeIndex(df['full_date']).month
     df['d'] = pd.DatetimeIndex(df['full_date']).day
 
+    return df
+
+def addDaySuffix(df:pd.DataFrame, engine:str, region:str)->pd.DataFrame:
     # day suffix ('st', 'nd', 'rd', 'th')
-    df['day_suffix'] = df.apply(lambda x: date_udfs.suffixConditions(x['d']), axis=1)
+    if engine == 'apply':
+        df['day_suffix'] = df.apply(lambda x: date_udfs.suffixConditions(x['d']), axis=1)
+    else:
+        df['day_suffix'] = vectorized_udfs.getDaySuffixes(df['d'])
+
+    return df
 
+def addYearMonth(df:pd.DataFrame, engine:str, region:str)->pd.DataFrame:
     # year with month in format YYYY-MM
-    df['year_month'] = df.apply(lambda x: date_udfs.getYearMonth(x['full_date'], 0), axis=1)
+    if engine == 'apply':
+        df['year_month'] = df.apply(lambda x: date_udfs.getYearMonth(x['full_date'], 0), axis=1)
+    else:
+        df['year_month'] = vectorized_udfs.getYearMonths(df['y'], df['m'], 0)
+
+    return df
 
+def addDayNames(df:pd.DataFrame, engine:str, region:str)->pd.DataFrame:
     # day of week (0 = Monday, 6 = Sunday)
     df['wkd'] = df['full_date'].dt.day_of_week
 
@@ -96,170 +213,609 @@ def createCalendar(start_year:int, for_years:int)->pd.DataFrame:
     # month name
     df['month_name'] = df['full_date'].dt.month_name()
 
+    # day order in year
+    df['day_year'] = df['full_date'].dt.day_of_year
+
+    return df
+
+def addQuarters(df:pd.DataFrame, engine:str, region:str)->pd.DataFrame:
     # quarter (1-4)
     df['q'] = df['full_date'].dt.quarter
 
     # year with quarter in format YYYY-Q1-4
     df['year_quarter'] = df['y'].astype(str) + '-Q' +  df['q'].astype(str)
 
-    # day order in year
-    df['day_year'] = df['full_date'].dt.day_of_year
+    return df
 
+def addWeekNumbers(df:pd.DataFrame, engine:str, region:str)->pd.DataFrame:
     # week number in year
-    df['w'] = df.apply(lambda x: date_udfs.getWeek(x['full_date']), axis=1)
+    if engine == 'apply':
+        df['w'] = df.apply(lambda x: date_udfs.getWeek(x['full_date']), axis=1)
+    else:
+        df['w'] = vectorized_udfs.getWeeks(df['full_date'])
     df['iso_w'] = df['full_date'].dt.isocalendar().week
 
+    return df
+
+def addWeekMonth(df:pd.DataFrame, engine:str, region:str)->pd.DataFrame:
     # week number in month
-    df = df_udfs.addColumnByWindowFunction(df, 'week_month', ['year_month', 'w'], 'row number')
+    if engine == 'apply':
+        df = df_udfs.addColumnByWindowFunction(df, 'week_month', ['year_month', 'w'], 'row number')
+    else:
+        df['week_month'] = vectorized_udfs.getWeekMonths(df['full_date'], df['w'])
 
-    # identify weekend and weekday
-    df['is_weekend'] = df.apply(lambda x: date_udfs.isWeekend(x['wkd']), axis=1)
-    df['is_weekday'] = df.apply(lambda x: date_udfs.isWeekday(x['wkd']), axis=1)
+    return df
 
-    # previous and next day
-    df['previous_weekday'] = df.apply(lambda x: date_udfs.getPreviousWeekDay(x, x['wkd']), axis=1)
-    df['next_weekday'] = df.apply(lambda x: date_udfs.getNextWeekDay(x, x['wkd']), axis=1)
+def addWeekdays(df:pd.DataFrame, engine:str, region:str)->pd.DataFrame:
+    if engine == 'apply':
+        # identify weekend and weekday
+        df['is_weekend'] = df.apply(lambda x: date_udfs.isWeekend(x['wkd']), axis=1)
+        df['is_weekday'] = df.apply(lambda x: date_udfs.isWeekday(x['wkd']), axis=1)
 
-    # create holidays
-    holidays = holidays_udfs.Holidays(df)
-    df = holidays.insertHolidays()
+        # previous and next day
+        df['previous_weekday'] = df.apply(lambda x: date_udfs.getPreviousWeekDay(x, x['wkd']), axis=1)
+        df['next_weekday'] = df.apply(lambda x: date_udfs.getNextWeekDay(x, x['wkd']), axis=1)
+    else:
+        df['is_weekend'] = vectorized_udfs.isWeekend(df['wkd'])
+        df['is_weekday'] = vectorized_udfs.isWeekday(df['wkd'])
+        df['previous_weekday'] = vectorized_udfs.getPreviousWeekDays(df['full_date'], df['wkd'])
+        df['next_weekday'] = vectorized_udfs.getNextWeekDays(df['full_date'], df['wkd'])
 
-    df['is_workday'] =  df.apply(lambda x: 1 if x['is_weekend'] == 0 and x['is_holiday'] == 0 else 0, axis=1)
+    return df
 
+def addYearBoundaries(df:pd.DataFrame, engine:str, region:str)->pd.DataFrame:
+    # first and last day in year
+    if engine == 'apply':
+        df = date_udfs.getColumnBy(df, 'first_day_year', 'y', 'first')
+        df = date_udfs.getColumnBy(df, 'last_day_year', 'y', 'last')
+    else:
+        df['first_day_year'], df['last_day_year'] = vectorized_udfs.getPeriodBoundaries(df['full_date'], 'year')
 
-    df_workdays = df.loc[df['is_workday']==1, ['full_date', 'year_month']].reset_index()
+    return df
 
-    df_workdays['day_order'] = df_workdays.sort_values(['full_date'], ascending=True).groupby(['year_month']).cumcount() + 1
+def addQuarterBoundaries(df:pd.DataFrame, engine:str, region:str)->pd.DataFrame:
+    # first and last day in quarter
+    if engine == 'apply':
+        df = date_udfs.getColumnBy(df, 'first_day_quarter', 'year_quarter', 'first')
+        df = date_udfs.getColumnBy(df, 'last_day_quarter', 'year_quarter', 'last')
+    else:
+        df['first_day_quarter'], df['last_day_quarter'] = vectorized_udfs.getPeriodBoundaries(df['full_date'], 'quarter')
 
-    df_workdays['workday_id'] = df_workdays.reset_index().index + 1
+    return df
 
-    df_workdays['pwd_id'] = df_workdays['workday_id'] - 1
-    df_workdays['pwd_date'] = pd.merge(df_workdays, df_workdays, how='left', left_on=['pwd_id'], right_on=['workday_id'], suffixes=[None, '_prev'])['full_date_prev']
+def addMonthBoundaries(df:pd.DataFrame, engine:str, region:str)->pd.DataFrame:
+    # first and last day in month
+    if engine == 'apply':
+        df = date_udfs.getColumnBy(df, 'first_day_month', 'year_month', 'first')
+        df = date_udfs.getColumnBy(df, 'last_day_month', 'year_month', 'last')
+    else:
+        df['first_day_month'], df['last_day_month'] = vectorized_udfs.getPeriodBoundaries(df['full_date'], 'month')
 
-    df_workdays['nwd_id'] = df_workdays['workday_id'] + 1
-    df_workdays['nwd_date'] = pd.merge(df_workdays, df_workdays, how='left', left_on=['nwd_id'], right_on=['workday_id'], suffixes=[None, '_next'])['full_date_next']
+    return df
 
-    df['workday_id'] = pd.merge(df, df_workdays, how='left', on=['full_date'])['workday_id']
+def addWeekBoundaries(df:pd.DataFrame, engine:str, region:str)->pd.DataFrame:
+    # first and last day in week
+    if engine == 'apply':
+        df = date_udfs.getColumnBy(df, 'first_day_week', ['y', 'w'], 'first')
+        df = date_udfs.getColumnBy(df, 'last_day_week', ['y', 'w'], 'last')
+    else:
+        df['first_day_week'], df['last_day_week'] = vectorized_udfs.getWeekBoundaries(df['full_date'], df['wkd'])
 
+    return df
 
-    # create dataframe by months
-    df_workdays_months = df_workdays.groupby(['year_month']).agg({
-        'workday_id':['min', 'max'],
-        'full_date': ['min', 'max']}).reset_index()
-    df_workdays_months.columns = ['year_month', 'id_min', 'id_max', 'date_min', 'date_max']
+def addAdjacentPeriods(df:pd.DataFrame, engine:str, region:str)->pd.DataFrame:
+    # previous and next year, quarter, month and day
+    df['previous_day'] = df['full_date'] + pd.DateOffset(-1)
+    df['next_day'] = df['full_date'] + pd.DateOffset(1)
 
+    if engine == 'apply':
+        df['previous_year_month'] = df.apply(lambda x: date_udfs.getYearMonth(x['full_date'], -1), axis=1)
+        df['next_year_month'] = df.apply(lambda x: date_udfs.getYearMonth(x['full_date'], +1), axis=1)
+    else:
+        df['previous_year_month'] = vectorized_udfs.getYearMonths(df['y'], df['m'], -1)
+        df['next_year_month'] = vectorized_udfs.getYearMonths(df['y'], df['m'], +1)
 
-    for index, row in df.iterrows():
-        current_month = row['year_month']
-        current_date = row['full_date']
+    df['previous_quarter'] = (df['full_date'] + pd.DateOffset(months=-3)).dt.quarter
+    df['next_quarter'] = (df['full_date'] + pd.DateOffset(months=3)).dt.quarter
 
-        if pd.isnull(row['workday_id']):
-            min_wd_day = df_workdays_months.loc[df_workdays_months['year_month'] == current_month, 'date_min'].item()
-            max_wd_day = df_workdays_months.loc[df_workdays_months['year_month'] == current_month, 'date_max'].item()
+    df['previous_year'] = pd.DatetimeIndex(df['full_date'] + pd.DateOffset(months=-12)).year
+    df['next_year'] = pd.DatetimeIndex(df['full_date'] + pd.DateOffset(months=12)).year
+
+    return df
 
-            if current_date < min_wd_day:
-                df.loc[index, 'workday_id'] = df_workdays_months.loc[df_workdays_months['year_month'] == current_month, 'id_min'].item()
-            elif current_date > max_wd_day:
-                df.loc[index, 'workday_id'] = df_workdays_months.loc[df_workdays_months['year_month'] == current_month, 'id_max'].item()
-            else:
-                # vezmi předcházející workday_id v daném měsíci
-                need_assign = True
+def addHolidays(df:pd.DataFrame, engine:str, region:str)->pd.DataFrame:
+    # create holidays
+    holidays = holidays_udfs.Holidays(df, region)
+
+    return holidays.insertHolidays()
+
+def addWorkdayFlags(df:pd.DataFrame, engine:str, region:str)->pd.DataFrame:
+    # identify workday
+    if engine == 'apply':
+        df['is_workday'] =  df.apply(lambda x: 1 if x['is_weekend'] == 0 and x['is_holiday'] == 0 else 0, axis=1)
+    else:
+        df['is_workday'] = vectorized_udfs.isWorkday(df['is_weekend'], df['is_holiday'])
 
-                previous_date = current_date + pd.Timedelta(days=-1)
-                while need_assign:
-                    if (previous_date in df_workdays['full_date'].values):
-                        df.loc[index, 'workday_id'] = df_workdays.loc[df_workdays['full_date']==previous_date,'workday_id'].item()
-                        need_assign = False
-                    else:
-                        previous_date = previous_date + pd.Timedelta(days=-1)
-        else:
-            pass
+    return df
+
+def addWorkdayAssignment(df:pd.DataFrame, engine:str, region:str)->pd.DataFrame:
+    df_workdays = df.loc[df['is_workday']==1, ['full_date', 'year_month']].reset_index()
+
+    df_workdays['day_order'] = df_workdays.sort_values(['full_date'], ascending=True).groupby(['year_month']).cumcount() + 1
+
+    df_workdays['workday_id'] = df_workdays.reset_index().index + 1
 
-    df['workday_id'] = df['workday_id'].astype(int)
+    # assign every day to its workday (the previous one in the month or the first one in the month)
+    workday_position = vectorized_udfs.getWorkdayPositions(df['full_date'], df['is_workday'])
 
-    df['workday_date'] = pd.merge(df, df_workdays, how='left', on=['workday_id'], suffixes=[None, '_new'])['full_date_new']
-    df['workday_number'] = pd.merge(df, df_workdays, how='left', on=['workday_id'])['day_order']
+    # workday dates padded with NaT for the workdays before the first and after the last one
+    workday_dates = np.concatenate([[np.datetime64('NaT', 'ns')], df_workdays['full_date'].to_numpy(), [np.datetime64('NaT', 'ns')]])
 
-    df['pwd'] = pd.merge(df, df_workdays, how='left', on=['workday_id'])['pwd_date']
+    df['workday_id'] = df_workdays['workday_id'].to_numpy()[workday_position]
+    df['workday_date'] = workday_dates[workday_position + 1]
+    df['workday_number'] = df_workdays['day_order'].to_numpy()[workday_position]
+
+    df['pwd'] = workday_dates[workday_position]
     df['pwd'] = df['pwd'].fillna(date_udfs.getMissingWd(df, 'pwd'))
 
-    df['nwd'] = pd.merge(df, df_workdays, how='left', on=['workday_id'])['nwd_date']
+    df['nwd'] = workday_dates[workday_position + 2]
     df['nwd'] = df['nwd'].fillna(date_udfs.getMissingWd(df, 'nwd'))
 
-    # first and last workday in month
-    df['first_workday_in_month'] = pd.merge(df, df_workdays_months, how='inner', on=['year_month'], suffixes=[None, '_new'])['date_min']
-    df['last_workday_in_month'] = pd.merge(df, df_workdays_months, how='inner', on=['year_month'], suffixes=[None, '_new'])['date_max']
-
-    # first and last day in year, quarter, month and week
-    df = date_udfs.getColumnBy(df, 'first_day_year', 'y', 'first')
-    df = date_udfs.getColumnBy(df, 'first_day_quarter', 'year_quarter', 'first')
-    df = date_udfs.getColumnBy(df, 'first_day_month', 'year_month', 'first')
-    df = date_udfs.getColumnBy(df, 'first_day_week', ['y', 'w'], 'first')
-
-    df = date_udfs.getColumnBy(df, 'last_day_year', 'y', 'last')
-    df = date_udfs.getColumnBy(df, 'last_day_quarter', 'year_quarter', 'last')
-    df = date_udfs.getColumnBy(df, 'last_day_month', 'year_month', 'last')
-    df = date_udfs.getColumnBy(df, 'last_day_week', ['y', 'w'], 'last')
-    
-    # previous and next year, quarter, month and day
-    df['previous_day'] = df['full_date'] + pd.DateOffset(-1)
-    df['next_day'] = df['full_date'] + pd.DateOffset(1)
+    return df
 
-    df['previous_year_month'] = df.apply(lambda x: date_udfs.getYearMonth(x['full_date'], -1), axis=1)
-    df['next_year_month'] = df.apply(lambda x: date_udfs.getYearMonth(x['full_date'], +1), axis=1)
+def addWorkdayMonths(df:pd.DataFrame, engine:str, region:str)->pd.DataFrame:
+    if engine == 'apply':
+        # create dataframe by months
+        df_workdays_months = df.loc[df['is_workday']==1].groupby(['year_month']).agg({
+            'full_date': ['min', 'max']}).reset_index()
+        df_workdays_months.columns = ['year_month', 'date_min', 'date_max']
 
-    df['previous_quarter'] = (df['full_date'] + pd.DateOffset(months=-3)).dt.quarter
-    df['next_quarter'] = (df['full_date'] + pd.DateOffset(months=3)).dt.quarter
+        # first and last workday in month
+        df['first_workday_in_month'] = pd.merge(df, df_workdays_months, how='inner', on=['year_month'], suffixes=[None, '_new'])['date_min']
+        df['last_workday_in_month'] = pd.merge(df, df_workdays_months, how='inner', on=['year_month'], suffixes=[None, '_new'])['date_max']
+    else:
+        df['first_workday_in_month'], df['last_workday_in_month'] = vectorized_udfs.getWorkdayMonthBoundaries(df['full_date'], df['is_workday'])
 
-    df['previous_year'] = pd.DatetimeIndex(df['full_date'] + pd.DateOffset(months=-12)).year
-    df['next_year'] = pd.DatetimeIndex(df['full_date'] + pd.DateOffset(months=12)).year
+    return df
+
+def addCurrentPeriods(df:pd.DataFrame, engine:str='vectorized', as_of=None)->pd.DataFrame:
+    """Add flags identifying today and the current week, month, quarter and year.
+
+    Args:
+        df (DataFrame): calendar with columns full_date, y, m, q and w
+        engine (str): 'vectorized' or 'apply', see createCalendar
+        as_of (date): date the flags are computed for, now by default
 
-    # current period flags
-    if end_date < datetime.now().date():
+    Returns:
+        DataFrame: calendar with is_today and is_current_* columns
+    """
+    current_date = pd.Timestamp.now() if as_of is None else pd.Timestamp(as_of)
+
+    if not isInCalendar(df, current_date):
         df['is_today'] = 0
-        df['is_report_day'] = 0
         df['is_current_week'] = 0
         df['is_current_month'] = 0
         df['is_current_quarter'] = 0
         df['is_current_year'] = 0
+    elif engine == 'apply':
+        df['is_today'] = df.apply(lambda x: date_udfs.getCurrentPeriod(x['full_date'], 'today', current_date), axis=1)
+        df['is_current_week'] = df.apply(lambda x: date_udfs.getCurrentPeriod(x['full_date'], 'week', current_date), axis=1)
+        df['is_current_month'] = df.apply(lambda x: date_udfs.getCurrentPeriod(x['full_date'], 'month', current_date), axis=1)
+        df['is_current_quarter'] = df.apply(lambda x: date_udfs.getCurrentPeriod(x['full_date'], 'quarter', current_date), axis=1)
+        df['is_current_year'] = df.apply(lambda x: date_udfs.getCurrentPeriod(x['full_date'], 'year', current_date), axis=1)
     else:
-        df['is_today'] = df.apply(lambda x: date_udfs.getCurrentPeriod(x['full_date'], 'today'), axis=1)
+        for column, values in vectorized_udfs.getCurrentPeriods(df, current_date).items():
+            df[column] = values
 
+    return df
+
+def addReportDay(df:pd.DataFrame, engine:str='vectorized', as_of=None)->pd.DataFrame:
+    """Add flag identifying the report day - the workday of the previous workday of today.
+
+    Args:
+        df (DataFrame): calendar with columns full_date, is_today, pwd and workday_date
+        engine (str): 'vectorized' or 'apply', see createCalendar
+        as_of (date): date the flag is computed for, now by default
+
+    Returns:
+        DataFrame: calendar with is_report_day column
+    """
+    current_date = pd.Timestamp.now() if as_of is None else pd.Timestamp(as_of)
+
+    if not isInCalendar(df, current_date):
+        df['is_report_day'] = 0
+    elif engine == 'apply':
         pwd = df.loc[df['is_today']==1, 'pwd'].item()
         df['is_report_day'] = df.apply(lambda x : 1 if x['workday_date'] == pwd else 0, axis=1)
+    else:
+        df['is_report_day'] = vectorized_udfs.getReportDays(df, current_date)
 
-        df['is_current_week'] = df.apply(lambda x: date_udfs.getCurrentPeriod(x['full_date'], 'week'), axis=1)
-        df['is_current_month'] = df.apply(lambda x: date_udfs.getCurrentPeriod(x['full_date'], 'month'), axis=1)
-        df['is_current_quarter'] = df.apply(lambda x: date_udfs.getCurrentPeriod(x['full_date'], 'quarter'), axis=1)
-        df['is_current_year'] = df.apply(lambda x: date_udfs.getCurrentPeriod(x['full_date'], 'year'), axis=1)
+    return df
 
-    # created date
+def isInCalendar(df:pd.DataFrame, current_date:pd.Timestamp)->bool:
+    """Identify whether the date is between the first and the last day of the calendar."""
+    today = np.datetime64(current_date.date(), 'D').astype(np.int64)
+    days = vectorized_udfs.toEpochDays(df['full_date'])
+
+    return days.min() <= today <= days.max()
+
+# build steps as (step name, function, computed columns, columns they are computed from), functions take (df, engine, region)
+CALENDAR_STEPS = [
+    ('date_parts', addDateParts, ['y', 'm', 'd'], ['full_date']),
+    ('day_suffix', addDaySuffix, ['day_suffix'], ['d']),
+    ('year_month', addYearMonth, ['year_month'], ['full_date', 'y', 'm']),
+    ('day_names', addDayNames, ['wkd', 'wkd_name', 'month_name', 'day_year'], ['full_date']),
+    ('quarters', addQuarters, ['q', 'year_quarter'], ['full_date', 'y']),
+    ('week_numbers', addWeekNumbers, ['w', 'iso_w'], ['full_date']),
+    ('week_month', addWeekMonth, ['week_month'], ['full_date', 'year_month', 'w']),
+    ('weekdays', addWeekdays, ['is_weekend', 'is_weekday', 'previous_weekday', 'next_weekday'], ['full_date', 'wkd']),
+    ('year_boundaries', addYearBoundaries, ['first_day_year', 'last_day_year'], ['full_date', 'y']),
+    ('quarter_boundaries', addQuarterBoundaries, ['first_day_quarter', 'last_day_quarter'], ['full_date', 'year_quarter']),
+    ('month_boundaries', addMonthBoundaries, ['first_day_month', 'last_day_month'], ['full_date', 'year_month']),
+    ('week_boundaries', addWeekBoundaries, ['first_day_week', 'last_day_week'], ['full_date', 'y', 'wkd', 'w']),
+    ('adjacent_periods', addAdjacentPeriods, ['previous_day', 'next_day', 'previous_year_month', 'next_year_month',
+        'previous_quarter', 'next_quarter', 'previous_year', 'next_year'], ['full_date', 'y', 'm']),
+    ('holidays', addHolidays, ['is_holiday', 'holiday_name'], ['full_date', 'y', 'm', 'd']),
+    ('workday_flags', addWorkdayFlags, ['is_workday'], ['is_weekend', 'is_holiday']),
+    ('workday_assignment', addWorkdayAssignment, ['workday_id', 'workday_date', 'workday_number', 'pwd', 'nwd'], ['full_date', 'year_month', 'is_workday']),
+    ('workday_months', addWorkdayMonths, ['first_workday_in_month', 'last_workday_in_month'], ['full_date', 'year_month', 'is_workday']),
+    ('current_periods', lambda df, engine, region: addCurrentPeriods(df, engine), ['is_today', 'is_current_week', 'is_current_month',
+        'is_current_quarter', 'is_current_year'], ['full_date', 'y', 'm', 'q', 'w']),
+    ('report_day', lambda df, engine, region: addReportDay(df, engine), ['is_report_day'], ['full_date', 'is_today', 'pwd', 'workday_date']),
+]
+
+# column -> build step computing it
+COLUMN_STEPS = {column: step for step, _, columns, _ in CALENDAR_STEPS for column in columns}
+
+# column -> columns it is computed from
+COLUMN_DEPENDENCIES = {column: inputs for _, _, columns, inputs in CALENDAR_STEPS for column in columns}
+
+# region independent columns computed by the build steps
+DATE_DIMENSION_COLUMNS = [column for column in COLUMN_STEPS if column not in WORKDAY_COLUMNS + CURRENT_PERIOD_COLUMNS]
+
+def getColumnDependencies(columns:list)->list:
+    """Requested columns with all columns they are computed from, directly or indirectly."""
+    needed = list()
+    pending = list(columns)
+
+    while pending:
+        column = pending.pop()
+        if column not in needed:
+            needed.append(column)
+            pending.extend(COLUMN_DEPENDENCIES.get(column, []))
+
+    return needed
+
+def getBuildSteps(columns:list, available=())->list:
+    """Build steps computing the columns and their dependencies, in topological order.
+
+    Args:
+        columns (list): requested columns
+        available (list): columns already in the calendar, their steps are skipped
+
+    Returns:
+        list: step names of CALENDAR_STEPS
+    """
+    needed = [column for column in getColumnDependencies(columns) if column in COLUMN_STEPS and column not in available]
+    steps = set(COLUMN_STEPS[column] for column in needed)
+
+    # step -> steps computing its inputs
+    graph = {step: list(dict.fromkeys(COLUMN_STEPS[column] for column in inputs if column in COLUMN_STEPS and column not in available))
+        for step, _, _, inputs in CALENDAR_STEPS if step in steps}
+
+    return list(graphlib.TopologicalSorter(graph).static_order())
+
+def addColumns(df:pd.DataFrame, columns:list, engine:str='vectorized', region:str='CZ')->pd.DataFrame:
+    """Compute the columns and the columns they depend on, the columns already in the calendar are kept.
+
+    Args:
+        df (DataFrame): calendar with at least date_key and full_date
+        columns (list): columns to compute, see COLUMN_DEPENDENCIES
+        engine (str): 'vectorized' or 'apply', see createCalendar
+        region (str): holiday rules region, see holidays_udfs.getRegions
+
+    Returns:
+        DataFrame: calendar with the columns and their dependencies
+    """
+    step_functions = {step: function for step, function, _, _ in CALENDAR_STEPS}
+
+    for step in getBuildSteps(columns, df.columns):
+        with profile_udfs.stage(step, len(df)):
+            df = step_functions[step](df, engine, region)
+
+    return df
+
+@profile_udfs.profiled('createDateDimension')
+def createDateDimension(start_year:int, for_years:int, engine:str='vectorized', columns:list=None)->pd.DataFrame:
+    """Create the region independent columns of the calendar.
+
+    Args:
+        start_year (int): year when the calendar starts
+        for_years (int): number of years to create the calendar for
+        engine (str): 'vectorized' or 'apply', see createCalendar
+        columns (list): region independent columns to create with their dependencies, all by default
+
+    Returns:
+        DataFrame: calendar without the holiday, workday and current period columns
+    """
+    df = getBaseCalendar(start_year, for_years)
+
+    return addColumns(df, DATE_DIMENSION_COLUMNS if columns is None else columns, engine)
+
+@profile_udfs.profiled('addWorkdayColumns')
+def addWorkdayColumns(df:pd.DataFrame, region:str='CZ', engine:str='vectorized')->pd.DataFrame:
+    """Add the holiday and workday columns of a region to the date dimension.
+
+    Args:
+        df (DataFrame): date dimension created by createDateDimension
+        region (str): holiday rules region, see holidays_udfs.getRegions
+        engine (str): 'vectorized' or 'apply', see createCalendar
+
+    Returns:
+        DataFrame: calendar with holiday and workday columns
+    """
+    return addColumns(df, WORKDAY_COLUMNS, engine, region)
+
+@profile_udfs.profiled('addWorkdays')
+def addWorkdays(df:pd.DataFrame, engine:str='vectorized')->pd.DataFrame:
+    """Add the workday columns to a calendar with holidays.
+
+    Args:
+        df (DataFrame): date dimension with columns is_holiday and holiday_name
+        engine (str): 'vectorized' or 'apply', see createCalendar
+
+    Returns:
+        DataFrame: calendar with workday columns
+    """
+    return addColumns(df, WORKDAY_COLUMNS, engine)
+
+@profile_udfs.profiled('addCurrentPeriodFlags')
+def addCurrentPeriodFlags(df:pd.DataFrame, engine:str='vectorized', as_of=None)->pd.DataFrame:
+    """Add flags identifying today, the report day and the current week, month, quarter and year.
+
+    Args:
+        df (DataFrame): calendar with the base and workday columns
+        engine (str): 'vectorized' or 'apply', see createCalendar
+        as_of (date): date the flags are computed for, now by default
+
+    Returns:
+        DataFrame: calendar with is_today, is_report_day and is_current_* columns
+    """
+    df = addCurrentPeriods(df, engine, as_of)
+    df = addReportDay(df, engine, as_of)
+
+    return df
+
+@profile_udfs.profiled('refreshCurrentFlags')
+def refreshCurrentFlags(df:pd.DataFrame, as_of=None)->pd.DataFrame:
+    """Recompute only the columns changing from day to day in an existing calendar.
+
+    The flags is_today, is_report_day and is_current_* are compared against
+    a single as_of date and created is set to now, the other columns are kept.
+    The flags keep their types (e.g. int8 of the compact schema).
+
+    Args:
+        df (DataFrame): calendar created by createCalendar or read by io_udfs.readCalendar
+        as_of (date): date the flags are computed for, now by default
+
+    Returns:
+        DataFrame: calendar with refreshed flags
+    """
+    dtypes = {column: df[column].dtype for column in CURRENT_PERIOD_COLUMNS if column in df.columns}
+
+    df = addCurrentPeriodFlags(df, 'vectorized', as_of)
+    df = df.astype(dtypes)
     df['created'] = datetime.now()
 
     return df
-    
-if __name__ == '__main__':
 
-    # validate year input
-    while True:
-        start_year = int(input('Enter start year: '))
+@profile_udfs.profiled('stitchCalendars')
+def stitchCalendars(df:pd.DataFrame, df_next:pd.DataFrame)->tuple:
+    """Join workdays of two calendars built for consecutive years.
+
+    workday_id of the next calendar continues from the previous one and the
+    placeholders of the missing previous and next workday at the boundary
+    are replaced by the real last and first workday. Both calendars are
+    changed in place.
+
+    Args:
+        df (DataFrame): calendar of the earlier years
+        df_next (DataFrame): calendar of the years directly following df
+
+    Returns:
+        tuple: both calendars
+    """
+    last_workday_id = df['workday_id'].max()
+    df_next['workday_id'] = df_next['workday_id'] + last_workday_id
+
+    last_workday = df.loc[df['is_workday']==1, 'full_date'].max()
+    first_workday = df_next.loc[df_next['is_workday']==1, 'full_date'].min()
+    df.loc[df['workday_id'] == last_workday_id, 'nwd'] = first_workday
+    df_next.loc[df_next['workday_id'] == last_workday_id + 1, 'pwd'] = last_workday
+
+    return df, df_next
+
+@profile_udfs.profiled('createRegionalCalendars')
+def createRegionalCalendars(start_year:int, for_years:int, regions:list, engine:str='vectorized')->dict:
+    """Create calendars for several holiday regions.
+
+    The region independent date dimension is created once, only the holiday,
+    workday and current period columns are computed per region.
+
+    Args:
+        start_year (int): year when the calendar starts
+        for_years (int): number of years to create the calendar for
+        regions (list): holiday rules regions, see holidays_udfs.getRegions
+        engine (str): 'vectorized' or 'apply', see createCalendar
+
+    Returns:
+        dict: region -> calendar dataframe (df_udfs.toLongTable joins them to one table)
+    """
+    validation_udfs.validEngine(engine)
+
+    df_dates = createDateDimension(start_year, for_years, engine)
+    created = datetime.now()
+    calendars = dict()
 
-        if validation_udfs.validStartYear(start_year) == False:
-            print('Invalid start year. Please enter year between 1970 and 2100.')
-            exit()
-        else:
-            break
+    for region in regions:
+        df = addWorkdayColumns(df_dates.copy(), region, engine)
+        df = addCurrentPeriodFlags(df, engine)
+        df['created'] = created
+        calendars[region] = df[CALENDAR_COLUMNS]
 
-    # validate number of years input
-    while True:
-        for_years = int(input('Enter number of years: '))
+    return calendars
 
-        if validation_udfs.validForYears(for_years) == False:
-            print('Invalid number of years. Please enter a positive integer.')
-            exit()
-        else:
-            break
+@profile_udfs.profiled('createCalendarBlocks')
+def createCalendarBlocks(start_year:int, for_years:int, workers:int, engine:str='vectorized', region:str='CZ')->pd.DataFrame:
+    """Create calendar from blocks of years built in a process pool.
+
+    The range is split into one block of years per worker, the blocks are
+    built independently and then stitched sequentially (workday_id and the
+    pwd/nwd at block boundaries), the current period flags are computed for
+    the whole table. The result is equal to createCalendar with one worker.
+
+    Args:
+        start_year (int): year when the calendar starts
+        for_years (int): number of years to create the calendar for
+        workers (int): number of worker processes
+        engine (str): 'vectorized' or 'apply', see createCalendar
+        region (str): holiday rules region, see holidays_udfs.getRegions
+
+    Returns:
+        DataFrame: calendar dataframe
+    """
+    block_years = -(-for_years // workers)
+    block_starts = list(range(start_year, start_year + for_years, block_years))
+    block_lengths = [min(block_years, start_year + for_years - block_start) for block_start in block_starts]
+
+    # the workers get the resolved rules, rules registered in this process are not seen by spawned workers
+    with ProcessPoolExecutor(max_workers=workers, initializer=holidays_udfs.registerRules, initargs=(region, holidays_udfs.getRules(region))) as executor:
+        blocks = list(executor.map(createCalendar, block_starts, block_lengths, [engine] * len(block_starts), [False] * len(block_starts), [False] * len(block_starts), [1] * len(block_starts), [region] * len(block_starts)))
+
+    for i in range(1, len(blocks)):
+        blocks[i - 1], blocks[i] = stitchCalendars(blocks[i - 1], blocks[i])
+
+    df = pd.concat(blocks, ignore_index=True)
+
+    df = addCurrentPeriodFlags(df, engine)
+    df['created'] = datetime.now()
+
+    return df
+
+def generateCalendar(start_year:int, for_years:int, chunk_years:int=10, engine:str='vectorized', compact:bool=False, epoch_dates:bool=False, region:str='CZ'):
+    """Generate calendar in chunks of years with bounded memory.
+
+    Only two chunks are held at a time, the next chunk is built before the
+    previous one is yielded so that the workdays can be stitched across the
+    boundary. Concatenated chunks are equal to createCalendar over the whole range.
+
+    Args:
+        start_year (int): year when the calendar starts
+        for_years (int): number of years to create the calendar for
+        chunk_years (int): number of years in one chunk
+        engine, compact, epoch_dates, region: see createCalendar
+
+    Yields:
+        DataFrame: calendar of the next chunk_years years
+    """
+    validation_udfs.validForYears(for_years)
+    validation_udfs.validForYears(chunk_years)
+
+    created = datetime.now()
+    df_previous = None
+
+    for chunk_start in range(start_year, start_year + for_years, chunk_years):
+        df = createCalendar(chunk_start, min(chunk_years, start_year + for_years - chunk_start), engine, region=region)
+
+        if df_previous is not None:
+            df_previous, df = stitchCalendars(df_previous, df)
+            df = addCurrentPeriodFlags(df, engine)
+
+            # report day of today can be the last workday of the previous chunk
+            report_day = df.loc[df['is_today']==1, 'pwd']
+            if len(report_day) == 1 and report_day.item() < df['full_date'].iloc[0]:
+                df_previous['is_report_day'] = (df_previous['workday_date'] == report_day.item()).astype(int)
+
+            df_previous['created'] = created
+            yield df_udfs.compactCalendar(df_previous, epoch_dates) if compact else df_previous
+
+        df_previous = df
+
+    df_previous['created'] = created
+    yield df_udfs.compactCalendar(df_previous, epoch_dates) if compact else df_previous
+
+@profile_udfs.profiled('extendCalendar')
+def extendCalendar(existing, extra_years:int, engine:str='vectorized', region:str='CZ')->pd.DataFrame:
+    """Append years to an existing calendar without regenerating it.
+
+    Only the new years are built, the existing rows are changed just at the
+    boundary: the next workday of the days assigned to the last existing
+    workday, and the current period flags and created date of the whole table.
+    The result is equal to createCalendar over the whole range.
+
+    Args:
+        existing (DataFrame or str): calendar dataframe or path to a saved calendar
+        extra_years (int): number of years to append
+        engine (str): 'vectorized' or 'apply', see createCalendar
+        region (str): holiday rules region the existing calendar was created for
+
+    Returns:
+        DataFrame: extended calendar
+    """
+    validation_udfs.validForYears(extra_years)
+
+    if isinstance(existing, pd.DataFrame):
+        df = existing.copy()
+    else:
+        df = io_udfs.readCalendar(existing)
+
+    df_new = createCalendar(int(df['y'].max()) + 1, extra_years, engine, region=region)
+    df, df_new = stitchCalendars(df, df_new)
+
+    df = pd.concat([df, df_new], ignore_index=True)
+
+    df = addCurrentPeriodFlags(df, engine)
+    df['created'] = df_new['created'].iloc[0]
+
+    return df
+
+@profile_udfs.profiled('sliceCalendar')
+def sliceCalendar(df:pd.DataFrame, start_year:int, for_years:int)->pd.DataFrame:
+    """Cut the calendar of given years out of a calendar of a longer range.
+
+    workday_id is renumbered from 1 and the pwd of the first and nwd of the
+    last workday are reset to the placeholders of date_udfs.getMissingWd,
+    the other columns are the same in calendars of any range, so the result
+    is equal to createCalendar over the given years (with the created of the
+    longer calendar).
+
+    Args:
+        df (DataFrame): calendar with column full_date covering the given years
+        start_year (int): first year of the result
+        for_years (int): number of years of the result
+
+    Returns:
+        DataFrame: calendar of the given years
+    """
+    years = df['full_date'].dt.year
+    if start_year < years.min() or start_year + for_years - 1 > years.max():
+        raise ValueError(f'Calendar does not cover the years {start_year} - {start_year + for_years - 1}')
+
+    df = df.loc[(years >= start_year) & (years < start_year + for_years)].reset_index(drop=True)
+
+    if 'workday_id' in df.columns:
+        df['workday_id'] = df['workday_id'] - df['workday_id'].iloc[0] + 1
+
+        # the real workdays outside of the years are replaced by the placeholders of a calendar built for them
+        if 'pwd' in df.columns:
+            df.loc[df['workday_id'] == 1, 'pwd'] = date_udfs.getMissingWd(df, 'pwd')
+        if 'nwd' in df.columns:
+            df.loc[df['workday_id'] == df['workday_id'].iloc[-1], 'nwd'] = date_udfs.getMissingWd(df, 'nwd')
+
+    return df
+
+if __name__ == '__main__':
 
-    df = createCalendar(start_year, for_years)
+    import calendar_cli
 
-    df.to_csv('calendar.csv', index=False)
\ No newline at end of file
+    calendar_cli.main()
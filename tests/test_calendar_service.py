@@ -0,0 +1,37 @@
+import json
+import pytest
+import calendar_service
+import create_calendar
+
+@pytest.fixture(scope='module')
+def service():
+    lookup = calendar_service.CalendarLookup(create_calendar.createCalendar(2024, 1), '2024-05-06')
+
+    return calendar_service.CalendarService(lookup, port=0, reload=False)
+
+def test_lookup(service):
+    _, status, response, dates = service.handleRequest('GET', '/lookup?date=2024-05-08&fields=pwd,holiday_name', b'')
+
+    assert (status, dates) == (200, 1)
+    assert response == {'date': '2024-05-08', 'pwd': '2024-05-06', 'holiday_name': 'Victory Day'}
+
+def test_batch_lookup(service):
+    body = json.dumps({'dates': ['2024-05-02', '2025-01-01'], 'fields': ['is_report_day']}).encode()
+    _, status, response, _ = service.handleRequest('POST', '/lookup', body)
+
+    assert status == 200
+    assert response['results'] == [{'date': '2024-05-02', 'is_report_day': False}, {'date': '2025-01-01', 'error': 'not in calendar'}]
+
+@pytest.mark.parametrize('request_body', [
+    {'dates': ['2024-01-01'], 'fields': 5},
+    {'dates': ['2024-01-01'], 'fields': [5]},
+    {'dates': [20240101]},
+    {'dates': ['2024-01-01T10:00']},
+    {'dates': ['2024-02-30']},
+    {'dates': '2024-01-01'},
+])
+def test_invalid_batch_lookup(service, request_body):
+    _, status, response, _ = service.handleRequest('POST', '/lookup', json.dumps(request_body).encode())
+
+    assert status == 400
+    assert 'error' in response
@@ -0,0 +1,36 @@
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import pytest
+import create_calendar
+from udfs import holidays_udfs
+
+@pytest.fixture
+def region():
+    # holidays next to the year boundary, the real neighbouring workdays differ from the placeholders
+    holidays_udfs.registerRules('XX', pd.DataFrame({
+        'rule_type': ['fixed', 'fixed'],
+        'month': [12, 1],
+        'day': [31, 2],
+        'easter_offset': [None, None],
+        'holiday_name': ['Year End', 'Second Day of the Year'],
+        'date_from': ['1900-01-01', '1900-01-01'],
+        'date_to': [None, None]}))
+    yield 'XX'
+    holidays_udfs.rules_registry.pop('XX')
+
+def test_slice_equals_calendar(region):
+    df = create_calendar.sliceCalendar(create_calendar.createRegionalCalendars(2020, 6, [region])[region], 2022, 2)
+    expected = create_calendar.createCalendar(2022, 2, region=region)
+
+    pd.testing.assert_frame_equal(df.drop(columns='created'), expected.drop(columns='created'))
+
+def test_blocks_with_registered_rules(region, monkeypatch):
+    # spawned workers do not inherit the rules registry of the parent process
+    monkeypatch.setattr(create_calendar, 'ProcessPoolExecutor', functools.partial(ProcessPoolExecutor, mp_context=multiprocessing.get_context('spawn')))
+
+    df = create_calendar.createCalendar(2020, 4, region=region, workers=2)
+    expected = create_calendar.createCalendar(2020, 4, region=region)
+
+    pd.testing.assert_frame_equal(df.drop(columns='created'), expected.drop(columns='created'))
@@ -0,0 +1,8 @@
+import numpy as np
+from udfs import easter_calculator
+
+def test_easters_array_equals_easters():
+    years = np.arange(1583, 4100)
+    expected = np.array([easter_calculator.getEasters(int(y)) for y in years], dtype='datetime64[D]')
+
+    np.testing.assert_array_equal(easter_calculator.getEastersArray(years), expected)
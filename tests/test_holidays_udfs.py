@@ -0,0 +1,20 @@
+import create_calendar
+from udfs import holidays_udfs
+
+def test_movable_holidays_shared_between_ranges():
+    holidays_udfs.clearMovableHolidaysCache()
+
+    create_calendar.createCalendar(2000, 10)
+    cached_years = len(holidays_udfs.movable_holidays_cache)
+    create_calendar.createCalendar(2000, 11)
+
+    assert cached_years == 10
+    assert len(holidays_udfs.movable_holidays_cache) == 11
+
+def test_movable_holidays_bounded_by_calendar():
+    df = create_calendar.createCalendar(2024, 1)
+    holidays = holidays_udfs.Holidays(df.loc[df['full_date'] < '2024-03-30', ['full_date', 'y', 'm', 'd']].copy()).insertHolidays()
+
+    # Good Friday 2024-03-29 is inside, Easter Monday 2024-04-01 outside of the calendar
+    assert holidays.loc[holidays['full_date'] == '2024-03-29', 'holiday_name'].item() == 'Good Friday'
+    assert holidays['holiday_name'].isin(['Easter Monday']).sum() == 0
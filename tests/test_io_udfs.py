@@ -0,0 +1,39 @@
+import pandas as pd
+import pytest
+import create_calendar
+from udfs import io_udfs
+
+@pytest.fixture(scope='module')
+def calendar():
+    return create_calendar.createCalendar(2022, 2)
+
+@pytest.fixture
+def expected(calendar, tmp_path):
+    io_udfs.writeCalendar(calendar, tmp_path / 'expected.csv')
+    return io_udfs.readCalendar(tmp_path / 'expected.csv')
+
+@pytest.mark.parametrize('compression', [None, 'gzip', 'bz2', 'zip'])
+def test_csv_compression_round_trip(calendar, expected, tmp_path, compression):
+    path = tmp_path / f'calendar{io_udfs.getExtension("csv", compression)}'
+    io_udfs.writeCalendar(calendar, path, compression=compression)
+
+    pd.testing.assert_frame_equal(io_udfs.readCalendar(path), expected)
+
+def test_csv_chunks_round_trip(calendar, expected, tmp_path):
+    path = tmp_path / 'calendar.csv.gz'
+    io_udfs.writeCalendarChunks([calendar.iloc[:100], calendar.iloc[100:]], path)
+
+    pd.testing.assert_frame_equal(io_udfs.readCalendar(path), expected)
+
+def test_csv_compression_must_match_extension(calendar, tmp_path):
+    with pytest.raises(ValueError, match='extension'):
+        io_udfs.writeCalendar(calendar, tmp_path / 'calendar.csv', compression='gzip')
+
+def test_zip_csv_chunks_rejected(calendar, tmp_path):
+    with pytest.raises(ValueError, match='zip'):
+        io_udfs.writeCalendarChunks([calendar.iloc[:100], calendar.iloc[100:]], tmp_path / 'calendar.csv.zip')
+
+def test_format_of_compressed_csv():
+    assert io_udfs.getFormat('calendar.csv.gz') == 'csv'
+    assert io_udfs.splitExtension('calendar.csv.gz') == ('calendar', '.csv.gz')
+    assert io_udfs.splitExtension('calendar.parquet') == ('calendar', '.parquet')
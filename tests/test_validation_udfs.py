@@ -0,0 +1,38 @@
+import pytest
+import create_calendar
+from udfs import validation_udfs
+
+@pytest.fixture(scope='module')
+def calendar():
+    return create_calendar.createCalendar(2022, 1)
+
+def test_valid_calendar(calendar):
+    report = validation_udfs.validateCalendar(calendar)
+
+    assert report['valid']
+    assert report['rows'] == len(calendar)
+
+@pytest.mark.parametrize('chunk_rows', [1, 2, 7, 100])
+def test_chunks_equal_whole_calendar(calendar, chunk_rows):
+    # 1 January is a holiday, the first chunks have no workdays
+    chunks = [calendar.iloc[start:start + chunk_rows] for start in range(0, len(calendar), chunk_rows)]
+
+    assert validation_udfs.validateCalendarChunks(chunks) == validation_udfs.validateCalendar(calendar)
+
+def test_first_chunk_without_workdays(calendar):
+    report = validation_udfs.validateCalendarChunks([calendar.iloc[:2], calendar.iloc[2:]])
+
+    assert report['valid']
+
+def test_offending_rows(calendar):
+    df = calendar.copy()
+    df.loc[10, 'workday_id'] += 5
+    df.loc[20, 'iso_w'] = 60
+
+    report = validation_udfs.validateCalendarChunks([df.iloc[:15], df.iloc[15:]], max_rows=1)
+
+    assert not report['valid']
+    assert report['rules']['workday_id_monotonic']['rows'][0]['row'] == 10
+    assert len(report['rules']['workday_id_monotonic']['rows']) == 1
+    assert report['rules']['week_numbers']['failures'] == 1
+    assert report['rules']['week_numbers']['rows'][0]['iso_w'] == 60
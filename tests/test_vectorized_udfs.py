@@ -0,0 +1,9 @@
+import numpy as np
+import pandas as pd
+from udfs import date_udfs, vectorized_udfs
+
+def test_weeks_equal_get_week():
+    dates = pd.date_range('1970-01-01', '2100-12-31', freq='D')
+    expected = np.array([date_udfs.getWeek(date) for date in dates])
+
+    np.testing.assert_array_equal(vectorized_udfs.getWeeks(dates), expected)
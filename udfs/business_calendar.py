@@ -0,0 +1,139 @@
+import pandas as pd
+import numpy as np
+from udfs import io_udfs
+
+class BusinessCalendar:
+    """
+    Workday arithmetic over a calendar created by createCalendar.
+
+    The calendar is kept as a contiguous array of cumulative workday counts
+    indexed by the day offset from the first calendar day, and as a sorted
+    array of workdays. Scalar methods are O(1) and each batch method takes
+    whole arrays of dates at once.
+    """
+
+    def __init__(self, calendar):
+        """
+        Args:
+            calendar (DataFrame or str): calendar dataframe or path to a saved calendar
+        """
+        if not isinstance(calendar, pd.DataFrame):
+            calendar = io_udfs.readCalendar(calendar)
+
+        calendar = calendar.sort_values('full_date')
+        dates = self.toDays(calendar['full_date'].to_numpy())
+
+        if len(dates) == 0 or (dates[-1] - dates[0]).astype(np.int64) != len(dates) - 1:
+            raise ValueError('Calendar must contain a contiguous range of dates')
+
+        is_workday = calendar['is_workday'].to_numpy() == 1
+
+        self.first_day = dates[0]
+        self.first_day_number = int(dates[0].astype(np.int64))
+        self.last_day = dates[-1]
+        self.workdays = dates[is_workday]
+
+        # number of workdays before the day with the given offset (one item more for the day after the calendar)
+        self.workdays_before = np.concatenate([[0], np.cumsum(is_workday, dtype=np.int64)])
+
+    @staticmethod
+    def toDays(dates)->np.ndarray:
+        """Convert dates (datetime64, dates, strings or int32 days since epoch) to datetime64[D]."""
+        dates = np.asarray(dates)
+
+        if np.issubdtype(dates.dtype, np.integer):
+            return dates.astype('datetime64[D]')
+        if np.issubdtype(dates.dtype, np.datetime64):
+            return dates.astype('datetime64[D]')
+
+        return np.asarray(pd.to_datetime(dates.ravel()), dtype='datetime64[D]').reshape(dates.shape)
+
+    def getOffsets(self, dates, allow_day_after:bool=False)->np.ndarray:
+        """Day offsets of dates from the first calendar day, dates outside the calendar raise ValueError."""
+        offsets = (self.toDays(dates) - self.first_day).astype(np.int64)
+        last_offset = len(self.workdays_before) - (1 if allow_day_after else 2)
+
+        if offsets.size and (offsets.min() < 0 or offsets.max() > last_offset):
+            raise ValueError(f'Dates must be between {self.first_day} and {self.last_day}')
+
+        return offsets
+
+    def isWorkdayBatch(self, dates)->np.ndarray:
+        """Identify workdays for an array of dates."""
+        offsets = self.getOffsets(dates)
+
+        return self.workdays_before[offsets + 1] > self.workdays_before[offsets]
+
+    def getOffset(self, date, allow_day_after:bool=False)->int:
+        """Day offset of a single date from the first calendar day, see getOffsets."""
+        offset = int(np.datetime64(date, 'D').astype(np.int64)) - self.first_day_number
+        last_offset = len(self.workdays_before) - (1 if allow_day_after else 2)
+
+        if offset < 0 or offset > last_offset:
+            raise ValueError(f'Dates must be between {self.first_day} and {self.last_day}')
+
+        return offset
+
+    def isWorkday(self, date)->bool:
+        """Identify workday."""
+        offset = self.getOffset(date)
+
+        return bool(self.workdays_before[offset + 1] > self.workdays_before[offset])
+
+    def addWorkdaysBatch(self, dates, n)->np.ndarray:
+        """Add n workdays to each date.
+
+        For n > 0 returns the n-th workday after the date, for n < 0 the n-th
+        workday before the date and for n = 0 the date itself when it is a
+        workday, otherwise the next workday.
+
+        Args:
+            dates (array): dates
+            n (int or array): number of workdays to add, broadcast against dates
+
+        Returns:
+            ndarray: datetime64[ns] dates
+        """
+        offsets = self.getOffsets(dates)
+        n = np.asarray(n, dtype=np.int64)
+        before = self.workdays_before[offsets]
+        through = self.workdays_before[offsets + 1]
+
+        positions = np.where(n > 0, through + n - 1, before + n)
+
+        if positions.size and (positions.min() < 0 or positions.max() >= len(self.workdays)):
+            raise ValueError(f'Result is outside the calendar {self.first_day} - {self.last_day}')
+
+        return self.workdays[positions].astype('datetime64[ns]')
+
+    def addWorkdays(self, date, n:int)->pd.Timestamp:
+        """Add n workdays to date, see addWorkdaysBatch."""
+        offset = self.getOffset(date)
+
+        if n > 0:
+            position = int(self.workdays_before[offset + 1]) + n - 1
+        else:
+            position = int(self.workdays_before[offset]) + n
+
+        if position < 0 or position >= len(self.workdays):
+            raise ValueError(f'Result is outside the calendar {self.first_day} - {self.last_day}')
+
+        return pd.Timestamp(self.workdays[position])
+
+    def countWorkdaysBatch(self, start_dates, end_dates)->np.ndarray:
+        """Count workdays from start date (inclusive) to end date (exclusive).
+
+        The count is negative when the end date is before the start date. The
+        end date can be the day after the last calendar day.
+        """
+        start_offsets = self.getOffsets(start_dates, allow_day_after=True)
+        end_offsets = self.getOffsets(end_dates, allow_day_after=True)
+
+        return self.workdays_before[end_offsets] - self.workdays_before[start_offsets]
+
+    def countWorkdays(self, start_date, end_date)->int:
+        """Count workdays from start date (inclusive) to end date (exclusive)."""
+        start_offset = self.getOffset(start_date, allow_day_after=True)
+        end_offset = self.getOffset(end_date, allow_day_after=True)
+
+        return int(self.workdays_before[end_offset] - self.workdays_before[start_offset])
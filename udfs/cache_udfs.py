@@ -0,0 +1,238 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+import numpy as np
+import pandas as pd
+from udfs import holidays_udfs
+
+# cache directory used when none is given
+DEFAULT_CACHE_DIR = os.environ.get('CALENDAR_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'calendar-python'))
+
+# total size of the cached calendars before the least recently used ones are evicted
+DEFAULT_MAX_BYTES = 512 * 2**20
+
+# source files of the calendar build, the cache key changes whenever any of them changes
+SOURCE_FILES = [os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'create_calendar.py')] \
+    + sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), '*.py')))
+
+# file with the column types and region of a cached calendar
+META_FILE = 'meta.json'
+
+# seconds after which temporary directories left by interrupted processes are removed
+STALE_SECONDS = 3600
+
+# nullable integer types stored without missing values, loaded as memory-mapped IntegerArrays
+INTEGER_ARRAY_DTYPES = ['Int8', 'Int16', 'Int32', 'Int64', 'UInt8', 'UInt16', 'UInt32', 'UInt64']
+
+# hash of the source files, computed once per process
+code_version = None
+
+def getCodeVersion()->str:
+    """
+    Hash of the source files of the calendar build.
+    """
+    global code_version
+
+    if code_version is None:
+        digest = hashlib.sha256()
+        for path in SOURCE_FILES:
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        code_version = digest.hexdigest()
+
+    return code_version
+
+def getRulesHash(region:str)->str:
+    """
+    Hash of the holiday rules of a region.
+    """
+    return hashlib.sha256(holidays_udfs.getRules(region).to_csv(index=False).encode()).hexdigest()
+
+def getDirectorySize(path)->int:
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+class CalendarCache:
+    """
+    On-disk cache of the deterministic calendar columns.
+
+    Every calendar is stored in its own directory named by the hash of the
+    parameters, the holiday rules and the source code, with one .npy file per
+    column (strings as int32 codes and a values array). Numeric and date
+    columns are memory-mapped on load, strings are decoded from their codes.
+    Entries are written to a temporary directory and renamed into
+    place, and evicted by renaming them away first, so several processes can
+    share the cache without locks - a concurrently evicted entry is a miss.
+    """
+
+    def __init__(self, path=None, max_bytes:int=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            path (str): cache directory, DEFAULT_CACHE_DIR by default
+            max_bytes (int): size bound of the cache, least recently used calendars are evicted above it
+        """
+        self.path = path or DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        os.makedirs(self.path, exist_ok=True)
+
+    def getKey(self, start_year:int, for_years:int, region:str='CZ')->str:
+        """
+        Content address of a calendar - hash of the parameters, holiday rules and source code.
+        """
+        key = {
+            'start_year': start_year,
+            'for_years': for_years,
+            'region': region,
+            'rules': getRulesHash(region),
+            'code': getCodeVersion()}
+
+        return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+    def getEntries(self)->list:
+        """
+        Cached calendars as (path, last use time, size in bytes) sorted from the least recently used.
+        """
+        entries = list()
+        for name in os.listdir(self.path):
+            entry_path = os.path.join(self.path, name)
+            try:
+                if not name.startswith('.'):
+                    entries.append((entry_path, os.path.getmtime(os.path.join(entry_path, META_FILE)), getDirectorySize(entry_path)))
+            except OSError:
+                continue
+
+        return sorted(entries, key=lambda entry: entry[1])
+
+    def load(self, key:str, columns:list=None)->pd.DataFrame:
+        """
+        Load a cached calendar.
+
+        Args:
+            key (str): key from getKey
+            columns (list): load only these columns, all cached columns by default
+
+        Returns:
+            DataFrame: cached columns (numeric and date columns as read-only memory maps) or None when the calendar is not cached
+        """
+        entry_path = os.path.join(self.path, key)
+
+        try:
+            with open(os.path.join(entry_path, META_FILE)) as f:
+                meta = json.load(f)
+
+            data = dict()
+            for column, column_meta in meta['columns'].items():
+                if columns is not None and column not in columns:
+                    continue
+
+                # plain ndarray view of the memory map, the memmap subclass would leak into the frame
+                values = np.asarray(np.load(os.path.join(entry_path, f'{column}.npy'), mmap_mode='r'))
+                if column_meta['kind'] == 'string':
+                    labels = np.load(os.path.join(entry_path, f'{column}.values.npy')).astype(object)
+                    data[column] = labels[values]
+                elif column_meta['extension']:
+                    data[column] = pd.array(values, dtype=column_meta['dtype']) if column_meta['dtype'] not in INTEGER_ARRAY_DTYPES \
+                        else pd.arrays.IntegerArray(values, np.zeros(len(values), dtype=bool), copy=False)
+                else:
+                    data[column] = values
+
+            # mark the entry as recently used
+            os.utime(os.path.join(entry_path, META_FILE))
+        except (OSError, ValueError, KeyError):
+            return None
+
+        # without copy the numeric and date columns stay memory-mapped
+        return pd.DataFrame(data, copy=False)
+
+    def store(self, key:str, df:pd.DataFrame, region:str=None):
+        """
+        Store a calendar and evict the least recently used ones above the size bound.
+
+        Args:
+            key (str): key from getKey
+            df (DataFrame): deterministic calendar columns
+            region (str): holiday rules region of the calendar (used by invalidate)
+        """
+        entry_path = os.path.join(self.path, key)
+        if os.path.isdir(entry_path):
+            return
+
+        tmp_path = tempfile.mkdtemp(prefix='.tmp-', dir=self.path)
+        try:
+            meta = {'region': region, 'created': time.time(), 'columns': dict()}
+
+            for column in df.columns:
+                series = df[column]
+                if series.dtype == object:
+                    codes, labels = pd.factorize(series)
+                    np.save(os.path.join(tmp_path, f'{column}.npy'), codes.astype(np.int32))
+                    np.save(os.path.join(tmp_path, f'{column}.values.npy'), np.asarray(labels, dtype=str))
+                    meta['columns'][column] = {'kind': 'string', 'dtype': 'object', 'extension': False}
+                else:
+                    extension = isinstance(series.dtype, pd.api.extensions.ExtensionDtype)
+                    values = series.to_numpy(dtype=series.dtype.numpy_dtype) if extension else series.to_numpy()
+                    np.save(os.path.join(tmp_path, f'{column}.npy'), values)
+                    meta['columns'][column] = {'kind': 'numeric', 'dtype': str(series.dtype), 'extension': extension}
+
+            with open(os.path.join(tmp_path, META_FILE), 'w') as f:
+                json.dump(meta, f)
+
+            # another process may have stored the same calendar meanwhile
+            try:
+                os.rename(tmp_path, entry_path)
+            except OSError:
+                pass
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+        self.evict()
+
+    def remove(self, entry_path):
+        """
+        Remove a cached calendar - it is renamed away first so readers never see a partial entry.
+        """
+        trash_path = os.path.join(self.path, f'.trash-{uuid.uuid4().hex}')
+        try:
+            os.rename(entry_path, trash_path)
+        except OSError:
+            return
+        shutil.rmtree(trash_path, ignore_errors=True)
+
+    def evict(self):
+        """
+        Remove the least recently used calendars until the cache fits into max_bytes.
+        """
+        for name in os.listdir(self.path):
+            stale_path = os.path.join(self.path, name)
+            try:
+                if name.startswith('.') and time.time() - os.path.getmtime(stale_path) > STALE_SECONDS:
+                    shutil.rmtree(stale_path, ignore_errors=True)
+            except OSError:
+                continue
+
+        entries = self.getEntries()
+        total_bytes = sum(size for _, _, size in entries)
+
+        for entry_path, _, size in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            self.remove(entry_path)
+            total_bytes -= size
+
+    def invalidate(self, region:str=None):
+        """
+        Remove all cached calendars, or only the calendars of a region (e.g. after its rules changed).
+        """
+        for entry_path, _, _ in self.getEntries():
+            if region is not None:
+                try:
+                    with open(os.path.join(entry_path, META_FILE)) as f:
+                        if json.load(f)['region'] != region:
+                            continue
+                except (OSError, ValueError, KeyError):
+                    pass
+            self.remove(entry_path)
@@ -1,6 +1,7 @@
 from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
+from udfs import profile_udfs
 
 def suffixConditions(day):
     if day in [1, 21, 31]:
@@ -84,13 +85,14 @@ def getNextWeekDay(df, day):
 
     return next_weekday
 
+@profile_udfs.profiled('date_udfs.getColumnBy')
 def getColumnBy(df, new_column, group_by_field, operation):
     if operation == 'first':
-        operation = 'np.min'
+        operation = 'min'
     elif operation == 'last':
-        operation = 'np.max'
+        operation = 'max'
 
-    grouped_df = df.groupby(group_by_field)['full_date'].apply(eval(operation)).reset_index()
+    grouped_df = df.groupby(group_by_field)['full_date'].agg(operation).reset_index()
     df[new_column] = pd.merge(df, grouped_df, how='inner', on=group_by_field, suffixes=['', '_r'])['full_date_r']
 
     return df
@@ -102,9 +104,10 @@ def getYearMonth(date, months_add):
 
     return year_month
 
-def getCurrentPeriod(date, period):
+def getCurrentPeriod(date, period, current_date=None):
 
-    current_date = date.now()
+    if current_date is None:
+        current_date = date.now()
 
     if period == 'today':
         return 1 if current_date.date() == date.date() else 0
@@ -117,6 +120,7 @@ def getCurrentPeriod(date, period):
     if period == 'year':
         return 1 if current_date.year == date.year else 0
     
+@profile_udfs.profiled('date_udfs.getMissingWd')
 def getMissingWd(df, missing_value):
 
     if missing_value == 'pwd':
@@ -130,9 +134,9 @@ def getMissingWd(df, missing_value):
 
     while set_match:
         if (wd.weekday() in [5, 6]) and (missing_value=='pwd'):
-            wd = dy + timedelta(days=-1)
+            wd = wd + timedelta(days=-1)
         elif (wd.weekday() in [5, 6]) and (missing_value=='nwd'):
-            wd = dy + timedelta(days=1)
+            wd = wd + timedelta(days=1)
         else:
             set_match = False
 
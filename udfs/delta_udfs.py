@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+from udfs import df_udfs, profile_udfs
+
+# columns not compared between calendar versions
+DELTA_IGNORED_COLUMNS = ['created']
+
+# kinds of changed rows in the order they are emitted
+CHANGE_TYPES = ['insert', 'update', 'delete']
+
+def getColumnHashes(df:pd.DataFrame, columns:list)->np.ndarray:
+    """
+    Hash of every value of the columns.
+
+    Returns:
+        ndarray: uint64 hashes with one row per calendar row and one column per column
+    """
+    hashes = np.empty((len(df), len(columns)), dtype=np.uint64)
+    for i, column in enumerate(columns):
+        hashes[:, i] = pd.util.hash_pandas_object(df[column], index=False).to_numpy()
+
+    return hashes
+
+@profile_udfs.profiled('delta_udfs.getCalendarDelta')
+def getCalendarDelta(df_previous:pd.DataFrame, df:pd.DataFrame, ignore_columns:list=DELTA_IGNORED_COLUMNS)->pd.DataFrame:
+    """
+    Rows changed between two versions of a calendar, keyed by date_key.
+
+    Both calendars are hashed per value, rows are matched by date_key and a
+    matched row is updated when any of its hashes differs. Inserted and
+    updated rows carry the values of the new calendar, deleted rows the
+    values of the previous one.
+
+    Args:
+        df_previous (DataFrame): previous calendar, e.g. read by io_udfs.readCalendar
+        df (DataFrame): new calendar with the same columns
+        ignore_columns (list): columns not compared (they are still emitted)
+
+    Returns:
+        DataFrame: changed rows ordered by change and date_key, with the leading columns
+            change ('insert', 'update' or 'delete') and changed_columns (comma separated, for updates)
+    """
+    df_previous = df_udfs.expandCalendar(df_previous)
+    df = df_udfs.expandCalendar(df)
+
+    missing_columns = sorted(set(df.columns) ^ set(df_previous.columns))
+    if missing_columns:
+        raise ValueError(f'Calendars must have the same columns, differing columns {missing_columns}')
+
+    columns = [column for column in df.columns if column not in ignore_columns and column != 'date_key']
+    keys_previous = df_previous['date_key'].to_numpy(dtype=np.int64)
+    keys = df['date_key'].to_numpy(dtype=np.int64)
+
+    _, matched, matched_previous = np.intersect1d(keys, keys_previous, assume_unique=True, return_indices=True)
+    changed = getColumnHashes(df.iloc[matched], columns) != getColumnHashes(df_previous.iloc[matched_previous], columns)
+    updated = changed.any(axis=1)
+
+    column_names = np.array(columns, dtype=object)
+    changed_columns = [','.join(column_names[row]) for row in changed[updated]]
+
+    inserted = np.flatnonzero(~np.isin(keys, keys_previous))
+    deleted = np.flatnonzero(~np.isin(keys_previous, keys))
+
+    changes = [
+        df.iloc[inserted].assign(change='insert', changed_columns=''),
+        df.iloc[matched[updated]].assign(change='update', changed_columns=changed_columns),
+        df_previous[df.columns].iloc[deleted].assign(change='delete', changed_columns='')]
+
+    # empty changes are left out, they would turn the column types to object
+    delta = pd.concat([rows for rows in changes if len(rows)] or changes[:1], ignore_index=True)
+
+    delta = delta[['change', 'changed_columns'] + list(df.columns)]
+
+    return delta.sort_values(['change', 'date_key'], key=lambda x: x.map(CHANGE_TYPES.index) if x.name == 'change' else x, ignore_index=True)
+
+def getDeltaSummary(delta:pd.DataFrame)->dict:
+    """
+    Number of inserted, updated and deleted rows and of updates per column.
+    """
+    changed_columns = delta.loc[delta['change'] == 'update', 'changed_columns'].str.split(',').explode()
+
+    return {
+        'rows': {change: int((delta['change'] == change).sum()) for change in CHANGE_TYPES},
+        'columns': {column: int(count) for column, count in changed_columns.value_counts().items()}}
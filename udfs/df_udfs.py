@@ -1,10 +1,140 @@
 import pandas as pd
+import numpy as np
+from udfs import io_udfs, profile_udfs
 
+# column types of the calendar created by createCalendar (date columns are datetime64[ns])
+CALENDAR_DTYPES = {
+    'date_key': 'int64',
+    'y': 'int32',
+    'm': 'int32',
+    'd': 'int32',
+    'day_suffix': 'object',
+    'year_month': 'object',
+    'wkd': 'int32',
+    'wkd_name': 'object',
+    'month_name': 'object',
+    'q': 'int32',
+    'year_quarter': 'object',
+    'day_year': 'int32',
+    'w': 'int64',
+    'iso_w': 'UInt32',
+    'week_month': 'int64',
+    'is_weekend': 'int64',
+    'is_weekday': 'int64',
+    'is_holiday': 'int64',
+    'holiday_name': 'object',
+    'is_workday': 'int64',
+    'workday_id': 'int64',
+    'workday_number': 'int64',
+    'previous_year_month': 'object',
+    'next_year_month': 'object',
+    'previous_quarter': 'int32',
+    'next_quarter': 'int32',
+    'previous_year': 'int32',
+    'next_year': 'int32',
+    'is_today': 'int64',
+    'is_report_day': 'int64',
+    'is_current_week': 'int64',
+    'is_current_month': 'int64',
+    'is_current_quarter': 'int64',
+    'is_current_year': 'int64'}
+
+# column types of the compact calendar schema
+COMPACT_DTYPES = {
+    'date_key': 'int32',
+    'y': 'int16',
+    'm': 'int8',
+    'd': 'int8',
+    'day_suffix': 'category',
+    'year_month': 'category',
+    'wkd': 'int8',
+    'wkd_name': 'category',
+    'month_name': 'category',
+    'q': 'int8',
+    'year_quarter': 'category',
+    'day_year': 'int16',
+    'w': 'int8',
+    'iso_w': 'int8',
+    'week_month': 'int8',
+    'is_weekend': 'int8',
+    'is_weekday': 'int8',
+    'is_holiday': 'int8',
+    'holiday_name': 'category',
+    'is_workday': 'int8',
+    'workday_id': 'int32',
+    'workday_number': 'int8',
+    'previous_year_month': 'category',
+    'next_year_month': 'category',
+    'previous_quarter': 'int8',
+    'next_quarter': 'int8',
+    'previous_year': 'int16',
+    'next_year': 'int16',
+    'is_today': 'int8',
+    'is_report_day': 'int8',
+    'is_current_week': 'int8',
+    'is_current_month': 'int8',
+    'is_current_quarter': 'int8',
+    'is_current_year': 'int8'}
+
+# date columns (without the created timestamp) which can be stored as days since 1970-01-01
+EPOCH_DATE_COLUMNS = [column for column in io_udfs.DATE_COLUMNS if column != 'created']
+
+@profile_udfs.profiled('df_udfs.addColumnByWindowFunction')
 def addColumnByWindowFunction(df, new_column, group_by_list ,operation):
     if operation == 'row number':
-        grouped_df = df.groupby(group_by_list).count().reset_index()
-        grouped_df = grouped_df.loc[:, group_by_list]
+        grouped_df = df[group_by_list].drop_duplicates().sort_values(group_by_list)
         grouped_df['col_order'] = grouped_df.sort_values(group_by_list[-1], ascending=True).groupby(group_by_list[0]).cumcount() + 1
         df[new_column] = pd.merge(df, grouped_df, how='inner', on=group_by_list)['col_order']
 
-    return df
\ No newline at end of file
+    return df
+
+@profile_udfs.profiled('df_udfs.compactCalendar')
+def compactCalendar(df:pd.DataFrame, epoch_dates:bool=False)->pd.DataFrame:
+    """Convert calendar to the compact schema.
+
+    Flags and small numbers are stored as int8/int16/int32, repeated strings
+    as categoricals and optionally dates as int32 days since 1970-01-01.
+    expandCalendar converts the compact calendar back to the standard schema.
+
+    Args:
+        df (DataFrame): calendar created by createCalendar
+        epoch_dates (bool): store date columns as int32 days since epoch
+
+    Returns:
+        DataFrame: calendar in the compact schema
+    """
+    df = df.astype({column: dtype for column, dtype in COMPACT_DTYPES.items() if column in df.columns})
+
+    if epoch_dates:
+        for column in EPOCH_DATE_COLUMNS:
+            if column in df.columns:
+                df[column] = df[column].to_numpy(dtype='datetime64[D]').astype(np.int32)
+
+    return df
+
+def expandCalendar(df:pd.DataFrame)->pd.DataFrame:
+    """Convert calendar in the compact schema back to the standard schema.
+
+    Int32 date columns (days since 1970-01-01) are converted back to
+    datetime64[ns], categoricals to strings and integers to their standard types.
+    """
+    df = df.astype({column: dtype for column, dtype in CALENDAR_DTYPES.items() if column in df.columns})
+
+    for column in EPOCH_DATE_COLUMNS:
+        if column in df.columns and pd.api.types.is_integer_dtype(df[column]):
+            df[column] = df[column].to_numpy().astype('datetime64[D]').astype('datetime64[ns]')
+
+    return df
+
+def toLongTable(calendars:dict)->pd.DataFrame:
+    """Join calendars of several regions to one long table keyed by (region, date_key).
+
+    Args:
+        calendars (dict): region -> calendar dataframe, e.g. from createRegionalCalendars
+
+    Returns:
+        DataFrame: calendars one after another with the leading column region
+    """
+    df = pd.concat([df.assign(region=region) for region, df in calendars.items()], ignore_index=True)
+
+    return df[['region'] + [column for column in df.columns if column != 'region']]
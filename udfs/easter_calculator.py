@@ -1,5 +1,6 @@
 from math import floor
 from datetime import date
+import numpy as np
 
 def getEasters(yy: int) -> date:
     """
@@ -46,3 +47,41 @@ def getEasters(yy: int) -> date:
         day_of_easter = 18 # Special case for d = 28, e = 6
 
     return date(yy, month_of_easter, day_of_easter)
+
+def getEastersArray(years) -> np.ndarray:
+    """
+    Calculates the dates of Easter Sunday for an array of years using the
+    same Gaussian algorithm as getEasters.
+
+    Parameters:
+    ----------
+    years : array-like of int
+        The years for which the date of Easter Sunday is to be calculated.
+
+    Returns:
+    -------
+    numpy.ndarray
+        A 'datetime64[D]' array with the date of Easter Sunday for each year.
+    """
+
+    yy = np.asarray(years, dtype=np.int64)
+
+    a = yy % 19
+    b = yy % 4
+    c = yy % 7
+    k = yy // 100
+    p = (13 + 8 * k) // 25
+    q = k // 4
+    m = (15 - p + k - q) % 30
+    n = (4 + k - q) % 7
+    d = (19 * a + m) % 30
+    e = (2 * b + 4 * c + 6 * d + n) % 7
+
+    # Day of Easter counted from the 1st of March (April 19 = 50, April 18 = 49)
+    day_of_easter = 22 + d + e
+    day_of_easter = np.where((d == 29) & (e == 6), 50, day_of_easter)
+    day_of_easter = np.where((d == 28) & (e == 6) & ((11 * m + 11) % 30 < 19), 49, day_of_easter)
+
+    first_of_march = (yy - 1970).astype('datetime64[Y]').astype('datetime64[M]') + 2
+
+    return first_of_march.astype('datetime64[D]') + (day_of_easter - 1)
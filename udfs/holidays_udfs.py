@@ -1,10 +1,121 @@
+import os
 import pandas as pd
-from datetime import date
-from udfs import easter_calculator
+from udfs import easter_calculator, profile_udfs
+
+# directory with holiday rule files named <region>.csv
+HOLIDAY_RULES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'holiday_rules')
+
+# columns of a holiday rule file
+RULE_COLUMNS = [
+    'rule_type',
+    'month',
+    'day',
+    'easter_offset',
+    'holiday_name',
+    'date_from',
+    'date_to']
+
+# holiday rule types - fixed date (month, day) or offset in days from Easter Sunday
+RULE_TYPES = ['fixed', 'easter']
+
+# holiday rules per region, loaded from the rule files or registered by registerRules
+rules_registry = dict()
+
+def validRules(rules:pd.DataFrame):
+    """
+    Check the holiday rules have the rule file columns and known rule types.
+    """
+    missing_columns = [col for col in RULE_COLUMNS if col not in rules.columns]
+    if missing_columns:
+        raise ValueError(f'Holiday rules are missing columns {missing_columns}')
+
+    unknown_types = set(rules['rule_type']) - set(RULE_TYPES)
+    if unknown_types:
+        raise ValueError(f'Unknown holiday rule types {sorted(unknown_types)}, use one of {RULE_TYPES}')
+
+def registerRules(region:str, rules:pd.DataFrame):
+    """
+    Register holiday rules for a region, replacing its rule file.
+
+    Args:
+        region (str): region code
+        rules (DataFrame): rules with the RULE_COLUMNS, empty date_to means valid without end
+    """
+    validRules(rules)
+    rules_registry[region] = rules[RULE_COLUMNS].reset_index(drop=True)
+
+def loadRules(region:str)->pd.DataFrame:
+    """
+    Load holiday rules of a region from its rule file in HOLIDAY_RULES_DIR.
+    """
+    path = os.path.join(HOLIDAY_RULES_DIR, f'{region}.csv')
+    if not os.path.isfile(path):
+        raise ValueError(f'Unknown holiday region {region!r}, available regions: {getRegions()}')
+
+    rules = pd.read_csv(path, dtype={'holiday_name': str}, keep_default_na=False, na_values={'month': '', 'day': '', 'easter_offset': '', 'date_to': ''})
+    validRules(rules)
+
+    return rules[RULE_COLUMNS]
+
+def getRules(region:str)->pd.DataFrame:
+    """
+    Holiday rules of a region, loaded from the rule file on first use.
+    """
+    if region not in rules_registry:
+        rules_registry[region] = loadRules(region)
+
+    return rules_registry[region]
+
+def getRegions()->list:
+    """
+    Regions with a rule file or registered rules.
+    """
+    regions = set(rules_registry)
+    if os.path.isdir(HOLIDAY_RULES_DIR):
+        regions.update(os.path.splitext(name)[0] for name in os.listdir(HOLIDAY_RULES_DIR) if name.endswith('.csv'))
+
+    return sorted(regions)
+
+# resolved movable holidays per (year, rule-set), shared by all calendars built in the process
+movable_holidays_cache = dict()
+
+@profile_udfs.profiled('holidays_udfs.getMovableHolidays')
+def getMovableHolidays(years, rules:tuple)->pd.DataFrame:
+    """
+    Resolve Easter holidays for given years, memoized per (year, rule-set).
+
+    Args:
+        years (iterable): years to resolve the holidays for
+        rules (tuple): rules as (easter_offset, easter_name, date_from, date_to) tuples, date_to None when open-ended
+
+    Returns:
+        DataFrame: columns easter_date, easter_name and rule_order
+    """
+    years = [int(y) for y in years]
+    missing_years = [y for y in years if (y, rules) not in movable_holidays_cache]
+
+    for y, easter_sunday in zip(missing_years, easter_calculator.getEastersArray(missing_years)):
+        resolved = list()
+        for rule_order, (easter_offset, easter_name, date_from, date_to) in enumerate(rules):
+            easter_date = pd.Timestamp(easter_sunday) + pd.Timedelta(days=easter_offset)
+            if pd.Timestamp(date_from) <= easter_date and (date_to is None or easter_date <= pd.Timestamp(date_to)):
+                resolved.append((easter_date, easter_name, rule_order))
+        movable_holidays_cache[(y, rules)] = tuple(resolved)
+
+    resolved = [holiday for y in years for holiday in movable_holidays_cache[(y, rules)]]
+
+    return pd.DataFrame(data=resolved, columns=['easter_date', 'easter_name', 'rule_order'])
+
+def clearMovableHolidaysCache():
+    """
+    Drop all memoized movable holidays (e.g. after the rules have changed).
+    """
+    movable_holidays_cache.clear()
 
 class Holidays:
-    def __init__(self, df:pd.DataFrame):
+    def __init__(self, df:pd.DataFrame, region:str='CZ'):
         self.df = df
+        self.rules = getRules(region)
         self.end_date = self.getEndDate()
         self.holidays_df = self.getHolidays()
         self.easters_df = self.getEaster()
@@ -21,92 +132,93 @@ class Holidays:
             'date_from',
             'date_to']
 
+        rules = self.rules.loc[self.rules['rule_type'] == 'fixed']
+
         holidays_list = list()
-        holidays_list.append([1, 1, 'Restoration Day of the Independent Czech State', date(1952, 1, 1), self.end_date])
-        holidays_list.append([5, 1, 'Labour Day', date(1952, 1, 1), self.end_date])
-        holidays_list.append([5, 8, 'Victory Day', date(1990, 5, 11), self.end_date])
-        holidays_list.append([5, 9, 'Victory Day', date(1952, 1, 1), date(1990, 5, 10)])
-        holidays_list.append([7, 5, 'Saints Cyril and Methodius Day', date(1990, 5, 10), self.end_date])
-        holidays_list.append([7, 6, 'Jan Hus Day', date(1990, 5, 18), self.end_date])
-        holidays_list.append([9, 28, 'Statehood Day', date(2000, 8, 9), self.end_date])
-        holidays_list.append([10, 28, 'Independent Czechoslovak State Day', date(1988, 9, 21), self.end_date])
-        holidays_list.append([11, 17, 'Struggle for Freedom and Democracy Day', date(2000, 8, 9), self.end_date])
-        holidays_list.append([12, 24, 'Christmas Eve', date(1990, 5, 10), self.end_date])
-        holidays_list.append([12, 25, 'Christmas Day', date(1990, 5, 10), self.end_date])
-        holidays_list.append([12, 26, 'Second Day of Christmas', date(1990, 5, 10), self.end_date])
+        for month, day, holiday_name, date_from, date_to in zip(rules['month'], rules['day'], rules['holiday_name'], rules['date_from'], rules['date_to']):
+            holidays_list.append([int(month), int(day), holiday_name, pd.Timestamp(date_from), self.end_date if pd.isna(date_to) else pd.Timestamp(date_to)])
 
         return pd.DataFrame(data=holidays_list, columns=holidays_col_list)
     
-    def getHolidaysToInsert(self)->list:
-        holidays_to_insert = list()
-
-        for i, df_row in self.df.iterrows():
-            for j, hol_row in self.holidays_df.iterrows():
-                # Ensure consistent types for date comparison
-
-                date_from = pd.Timestamp(hol_row['date_from'])
-                date_to = pd.Timestamp(hol_row['date_to'])
-
-                if (df_row['m'] == hol_row['holiday_month']) \
-                and (df_row['d'] == hol_row['holiday_day']) \
-                and (df_row['full_date'] >= date_from) \
-                and (df_row['full_date'] <= date_to):
-                    holidays_to_insert.append((i, hol_row['holiday_name']))
+    @profile_udfs.profiled('Holidays.getHolidaysToInsert')
+    def getHolidaysToInsert(self)->pd.Series:
+        """
+        Match fixed-date holidays to the calendar by (month, day) key and
+        validity interval.
 
-        return holidays_to_insert
+        Returns a Series of holiday names indexed by the calendar index.
+        """
+        holidays_df = self.holidays_df.reset_index(names='rule_order')
+        holidays_df['date_from'] = pd.to_datetime(holidays_df['date_from'])
+        holidays_df['date_to'] = pd.to_datetime(holidays_df['date_to'])
+
+        matched = pd.merge(
+            self.df[['m', 'd', 'full_date']].reset_index(names='row_index'),
+            holidays_df,
+            how='inner',
+            left_on=['m', 'd'],
+            right_on=['holiday_month', 'holiday_day'])
+        matched = matched.loc[(matched['full_date'] >= matched['date_from']) & (matched['full_date'] <= matched['date_to'])]
+        matched = matched.sort_values(['row_index', 'rule_order'], kind='stable')
+
+        return pd.Series(matched['holiday_name'].to_numpy(), index=matched['row_index'].to_numpy(), dtype=object)
     
     def getEaster(self)->pd.DataFrame:
 
         easters_col_list = [
-            'easter_day',
+            'easter_offset',
             'easter_name',
             'date_from',
             'date_to']
 
+        rules = self.rules.loc[self.rules['rule_type'] == 'easter']
+
         easters_list = list()
-        easters_list.append([4, 'Good Friday', date(2015, 12, 21), self.end_date])
-        easters_list.append([0, 'Easter Monday', date(1952, 1, 1), self.end_date])
+        for easter_offset, easter_name, date_from, date_to in zip(rules['easter_offset'], rules['holiday_name'], rules['date_from'], rules['date_to']):
+            easters_list.append([int(easter_offset), easter_name, pd.Timestamp(date_from), None if pd.isna(date_to) else pd.Timestamp(date_to)])
 
-        return pd.DataFrame(data=easters_list, columns=easters_col_list)
+        return pd.DataFrame(data=easters_list, columns=easters_col_list, dtype=object)
     
-    def getEastersToInsert(self)->list:
-        easters = list()
-        easters_to_insert = list()
-
-        for y in self.df['y'].unique():
-            easter_sunday = easter_calculator.getEasters(y)
-            easter_monday = easter_sunday + pd.Timedelta(days=1)
-            easter_friday = easter_sunday + pd.Timedelta(days=-2)
-
-            easters.append([4, easter_friday])
-            easters.append([0, easter_monday])
-
-        df_easters_dates = pd.DataFrame(data=easters, columns=['easter_day', 'easter_date'])
-
-        df_easters_dates = pd.merge(df_easters_dates, self.easters_df, on='easter_day', how='left')
-        df_easters_dates = df_easters_dates.query('easter_date >= date_from and easter_date <= date_to')
-
-        for i, df_row in self.df.iterrows():
-            for j, east_row in df_easters_dates.iterrows():
-                if df_row['full_date'].date() == east_row['easter_date']:
-                    easters_to_insert.append((i, east_row['easter_name']))
-
-        return easters_to_insert
+    @profile_udfs.profiled('Holidays.getEastersToInsert')
+    def getEastersToInsert(self)->pd.Series:
+        """
+        Match Easter holidays to the calendar by a join on date.
 
+        Returns a Series of holiday names indexed by the calendar index.
+        """
+        # open-ended rules keep date_to None, so the memoized holidays do not depend on the calendar range
+        rules = tuple(self.easters_df.itertuples(index=False, name=None))
+        df_easters_dates = getMovableHolidays(self.df['y'].unique(), rules)
+        df_easters_dates['easter_date'] = pd.to_datetime(df_easters_dates['easter_date'])
+        df_easters_dates = df_easters_dates.loc[df_easters_dates['easter_date'] <= self.end_date]
+
+        matched = pd.merge(
+            self.df[['full_date']].reset_index(names='row_index'),
+            df_easters_dates,
+            how='inner',
+            left_on='full_date',
+            right_on='easter_date')
+        matched = matched.sort_values(['row_index', 'rule_order'], kind='stable')
+
+        return pd.Series(matched['easter_name'].to_numpy(), index=matched['row_index'].to_numpy(), dtype=object)
+
+    @profile_udfs.profiled('Holidays.insertHolidays')
     def insertHolidays(self)->pd.DataFrame:
         """
         Insert holidays to the calendar dataframe.
         """
 
-        holidays_to_insert = self.getHolidaysToInsert() + self.getEastersToInsert()
+        holidays_to_insert = pd.concat([self.getHolidaysToInsert(), self.getEastersToInsert()])
+
+        # the last matching rule wins when more holidays fall on the same day
+        holidays_to_insert = holidays_to_insert[~holidays_to_insert.index.duplicated(keep='last')]
 
         # create columns for holidays with default values
         self.df['is_holiday'] = 0
         self.df['holiday_name'] = ''
 
         # insert holidays to the dataframe
-        for i in holidays_to_insert:
-            self.df['is_holiday'].at[i[0]] = 1
-            self.df['holiday_name'].at[i[0]] = i[1]
+        self.df.loc[holidays_to_insert.index, 'is_holiday'] = 1
+        self.df.loc[holidays_to_insert.index, 'holiday_name'] = holidays_to_insert.to_numpy()
 
         return self.df
\ No newline at end of file
@@ -0,0 +1,314 @@
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+import pandas as pd
+import numpy as np
+from udfs import profile_udfs
+
+# supported output formats (parquet and feather need pyarrow)
+FORMATS = ['csv', 'parquet', 'feather', 'npz']
+
+# file extensions of the csv compressions, readCalendar infers the compression from them
+CSV_COMPRESSION_EXTENSIONS = {'gzip': '.gz', 'bz2': '.bz2', 'zip': '.zip', 'xz': '.xz', 'zstd': '.zst'}
+
+# columns stored as dates
+DATE_COLUMNS = [
+    'full_date',
+    'previous_weekday',
+    'next_weekday',
+    'workday_date',
+    'pwd',
+    'nwd',
+    'first_workday_in_month',
+    'last_workday_in_month',
+    'first_day_year',
+    'first_day_quarter',
+    'first_day_month',
+    'first_day_week',
+    'last_day_year',
+    'last_day_quarter',
+    'last_day_month',
+    'last_day_week',
+    'previous_day',
+    'next_day',
+    'created']
+
+def splitExtension(path)->tuple:
+    """File path without the extension and the extension, including the compression of a csv (e.g. '.csv.gz')."""
+    root, extension = os.path.splitext(str(path))
+    if extension.lower() in CSV_COMPRESSION_EXTENSIONS.values():
+        root, format_extension = os.path.splitext(root)
+        extension = format_extension + extension
+
+    return root, extension
+
+def getExtension(format:str=None, compression:str=None)->str:
+    """File extension of the format (csv by default), csv files with the extension of the compression."""
+    format = format or 'csv'
+    if format == 'csv' and compression in CSV_COMPRESSION_EXTENSIONS:
+        return f'.csv{CSV_COMPRESSION_EXTENSIONS[compression]}'
+
+    return f'.{format}'
+
+def getFormat(path, format:str=None)->str:
+    """Output format given explicitly or by the file extension."""
+    if format is None:
+        format = splitExtension(path)[1].lstrip('.').split('.')[0].lower()
+    if format not in FORMATS:
+        raise ValueError(f'Format must be one of {", ".join(FORMATS)}')
+
+    return format
+
+def getCsvCompression(path, compression:str=None, chunked:bool=False)->str:
+    """
+    Compression of a csv file, which must match the file extension.
+
+    readCalendar infers the compression from the extension, so a csv
+    compressed differently could not be read back.
+
+    Args:
+        path (str): csv file path
+        compression (str): compression, by default the one of the file extension
+        chunked (bool): the file is written in chunks, which cannot be appended to a zip archive
+
+    Returns:
+        str: compression of the file extension or None
+    """
+    inferred = next((name for name, extension in CSV_COMPRESSION_EXTENSIONS.items() if str(path).lower().endswith(extension)), None)
+
+    if compression is not None and compression not in CSV_COMPRESSION_EXTENSIONS:
+        raise ValueError(f'Csv compression must be one of {", ".join(CSV_COMPRESSION_EXTENSIONS)}')
+    if compression is not None and compression != inferred:
+        raise ValueError(f'Csv compression {compression} needs the file extension {getExtension("csv", compression)}')
+    if chunked and inferred == 'zip':
+        raise ValueError('Csv chunks cannot be appended to a zip archive, use gzip, bz2, xz or zstd')
+
+    return inferred
+
+def getOutputFormat(path, format:str=None, compression:str=None, chunked:bool=False)->str:
+    """Output format of the file, for csv files with the compression checked by getCsvCompression."""
+    format = getFormat(path, format)
+    if format == 'csv':
+        getCsvCompression(path, compression, chunked)
+
+    return format
+
+def getPyarrow():
+    """Import pyarrow, which is needed only for parquet and feather files."""
+    try:
+        import pyarrow
+        import pyarrow.feather
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError('pyarrow is required for parquet and feather formats, use csv or npz instead')
+
+    return pyarrow
+
+@profile_udfs.profiled('io_udfs.writeCalendar')
+def writeCalendar(df:pd.DataFrame, path, format:str=None, compression:str=None):
+    """Write calendar to a file keeping the column types.
+
+    Args:
+        df (DataFrame): calendar dataframe
+        path (str): output file path
+        format (str): csv, parquet, feather or npz, by default taken from the file extension
+        compression (str): compression passed to the writer (e.g. 'gzip' for csv, which must
+            match the file extension, 'snappy' or 'zstd' for parquet, 'lz4' or 'zstd' for feather,
+            any value for npz)
+    """
+    if getFormat(path, format) == 'csv':
+        # written at once, a zip archive cannot be appended to by writeCalendarChunks
+        df.to_csv(path, index=False, compression=getCsvCompression(path, compression))
+    else:
+        writeCalendarChunks([df], path, format, compression)
+
+def writeCalendarChunks(chunks, path, format:str=None, compression:str=None):
+    """Write calendar chunk by chunk, only one chunk is held in memory.
+
+    Csv chunks are appended to the file, parquet chunks are written as row
+    groups, feather chunks as record batches and npz columns are streamed
+    to temporary files first. The file is the same as writeCalendar of the
+    concatenated chunks.
+
+    Args:
+        chunks (iterable): calendar dataframes with the same columns, e.g. from generateCalendar
+        path, format, compression: see writeCalendar
+    """
+    format = getFormat(path, format)
+
+    if format == 'csv':
+        compression = getCsvCompression(path, compression, chunked=True)
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(path, index=False, compression=compression, mode='w' if i == 0 else 'a', header=i == 0)
+    elif format in ['parquet', 'feather']:
+        pyarrow = getPyarrow()
+        writer = None
+        categories = dict()
+        try:
+            for chunk in chunks:
+                # categories of later chunks extend the earlier ones, so that dictionaries are written as deltas
+                for column in chunk.columns[chunk.dtypes.apply(lambda dtype: isinstance(dtype, pd.CategoricalDtype))]:
+                    known = categories.setdefault(column, list())
+                    known.extend(category for category in chunk[column].cat.categories if category not in set(known))
+                    chunk = chunk.assign(**{column: chunk[column].cat.set_categories(known)})
+
+                if writer is None:
+                    table = pyarrow.Table.from_pandas(chunk, preserve_index=False)
+                    # int32 dictionary indices leave room for categories of later chunks
+                    schema = pyarrow.schema(
+                        [field.with_type(pyarrow.dictionary(pyarrow.int32(), field.type.value_type)) if pyarrow.types.is_dictionary(field.type) else field for field in table.schema],
+                        metadata=table.schema.metadata)
+                    table = table.cast(schema)
+                    if format == 'parquet':
+                        writer = pyarrow.parquet.ParquetWriter(path, schema, compression=compression or 'snappy')
+                    else:
+                        options = pyarrow.ipc.IpcWriteOptions(
+                            compression=None if compression in [None, 'uncompressed'] else compression,
+                            emit_dictionary_deltas=True)
+                        writer = pyarrow.ipc.new_file(path, schema, options=options)
+                else:
+                    table = pyarrow.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        writeNpzChunks(chunks, path, compression)
+
+def writeNpz(df:pd.DataFrame, path, compression:str=None):
+    """Write calendar as numpy arrays, one array per column, see writeNpzChunks."""
+    writeNpzChunks([df], path, compression)
+
+def writeNpzChunks(chunks, path, compression:str=None):
+    """Write calendar chunks as numpy arrays, one array per column.
+
+    Column types are stored in the __schema__ entry. Strings are stored as
+    int32 codes with the distinct values in the __dictionary__<column> entry,
+    so that the file loads without pickle. Each column is appended to a
+    temporary file chunk by chunk and copied to the archive at the end.
+    """
+    schema = dict()
+    dictionaries = dict()
+    stored_dtypes = dict()
+    column_files = dict()
+    rows = 0
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for chunk in chunks:
+            for column in chunk.columns:
+                series = chunk[column]
+                schema.setdefault(column, str(series.dtype))
+
+                if series.dtype == object or isinstance(series.dtype, pd.CategoricalDtype):
+                    dictionary = dictionaries.setdefault(column, dict())
+                    codes, uniques = pd.factorize(series.to_numpy(dtype=object))
+                    uniques_codes = np.array([dictionary.setdefault(value, len(dictionary)) for value in uniques], dtype=np.int32)
+                    values = uniques_codes[codes]
+                elif isinstance(series.dtype, pd.api.extensions.ExtensionDtype):
+                    values = series.to_numpy(dtype=series.dtype.numpy_dtype)
+                else:
+                    values = series.to_numpy()
+
+                stored_dtypes.setdefault(column, values.dtype)
+                column_files.setdefault(column, os.path.join(tmp_dir, f'{len(column_files)}.bin'))
+                with open(column_files[column], 'ab') as f:
+                    f.write(np.ascontiguousarray(values, dtype=stored_dtypes[column]).tobytes())
+
+            rows += len(chunk)
+
+        zip_compression = zipfile.ZIP_DEFLATED if compression else zipfile.ZIP_STORED
+        with zipfile.ZipFile(path, 'w', compression=zip_compression, allowZip64=True) as archive:
+            for column, dtype in stored_dtypes.items():
+                with archive.open(f'{column}.npy', 'w', force_zip64=True) as member:
+                    np.lib.format.write_array_header_1_0(member, {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': (rows,)})
+                    with open(column_files[column], 'rb') as f:
+                        shutil.copyfileobj(f, member)
+
+            for column, dictionary in dictionaries.items():
+                with archive.open(f'__dictionary__{column}.npy', 'w') as member:
+                    np.lib.format.write_array(member, np.array(list(dictionary), dtype=str))
+
+            with archive.open('__schema__.npy', 'w') as member:
+                np.lib.format.write_array(member, np.array(json.dumps(schema)))
+
+def readNpz(path)->pd.DataFrame:
+    """Read calendar written by writeNpz."""
+    with np.load(path, allow_pickle=False) as data:
+        schema = json.loads(str(data['__schema__']))
+        columns = dict()
+
+        for column, dtype in schema.items():
+            if f'__dictionary__{column}' in data:
+                series = pd.Series(data[f'__dictionary__{column}'].astype(object)[data[column]], name=column)
+            else:
+                series = pd.Series(data[column], name=column)
+            columns[column] = series if str(series.dtype) == dtype else series.astype(dtype)
+
+    return pd.DataFrame(columns)
+
+@profile_udfs.profiled('io_udfs.readCalendar')
+def readCalendar(path, format:str=None, compression:str='infer')->pd.DataFrame:
+    """Read calendar saved by createCalendar.
+
+    Args:
+        path (str): path to the calendar file
+        format (str): csv, parquet, feather or npz, by default taken from the file extension
+        compression (str): compression of a csv file, by default inferred from the file extension
+
+    Returns:
+        DataFrame: calendar with date columns parsed and empty holiday names as ''
+    """
+    format = getFormat(path, format)
+
+    if format == 'parquet':
+        return getPyarrow().parquet.read_table(path).to_pandas()
+    if format == 'feather':
+        return getPyarrow().feather.read_table(path).to_pandas()
+    if format == 'npz':
+        return readNpz(path)
+
+    df = pd.read_csv(path, keep_default_na=False, compression=compression)
+
+    for column in DATE_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_datetime(df[column])
+
+    return df
+
+def readCalendarChunks(path, format:str=None, chunk_rows:int=100000, compression:str='infer'):
+    """Read calendar saved by createCalendar in chunks of rows.
+
+    Csv files are read chunk by chunk, parquet files by record batches and
+    feather files are memory-mapped, so only one chunk is held in memory.
+    Npz files are read whole and split.
+
+    Args:
+        path (str): path to the calendar file
+        format (str): csv, parquet, feather or npz, by default taken from the file extension
+        chunk_rows (int): rows per chunk
+        compression (str): compression of a csv file, by default inferred from the file extension
+
+    Yields:
+        DataFrame: calendar chunks as returned by readCalendar
+    """
+    format = getFormat(path, format)
+
+    if format == 'parquet':
+        for batch in getPyarrow().parquet.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    elif format == 'feather':
+        table = getPyarrow().feather.read_table(path, memory_map=True)
+        for start in range(0, table.num_rows, chunk_rows):
+            yield table.slice(start, chunk_rows).to_pandas()
+    elif format == 'npz':
+        df = readNpz(path)
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows].reset_index(drop=True)
+    else:
+        for df in pd.read_csv(path, keep_default_na=False, compression=compression, chunksize=chunk_rows):
+            for column in DATE_COLUMNS:
+                if column in df.columns:
+                    df[column] = pd.to_datetime(df[column])
+            yield df.reset_index(drop=True)
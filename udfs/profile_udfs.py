@@ -0,0 +1,180 @@
+import contextlib
+import functools
+import time
+import tracemalloc
+from collections import namedtuple
+import pandas as pd
+
+# one finished stage - depth is the nesting level, peak_bytes is None without memory tracing
+StageRecord = namedtuple('StageRecord', ['name', 'depth', 'seconds', 'rows', 'peak_bytes'])
+
+# profiler collecting the stages, None when profiling is disabled
+active_profiler = None
+
+# context manager returned by stage when profiling is disabled
+NO_STAGE = contextlib.nullcontext()
+
+class Profiler:
+    """
+    Collects wall time, rows and peak memory of named stages.
+
+    Activate it with profiling(profiler) or createCalendar(..., profiler=profiler),
+    the finished stages are in records (in the order they finished).
+    """
+
+    def __init__(self, memory:bool=True, callback=None):
+        """
+        Args:
+            memory (bool): trace the peak memory of every stage with tracemalloc (slows the build down)
+            callback (function): called with every StageRecord when the stage finishes
+        """
+        self.memory = memory
+        self.callback = callback
+        self.records = list()
+
+        # running stages as [start time, start memory, peak memory of finished child stages]
+        self.stack = list()
+
+    def startStage(self):
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self.stack:
+                self.stack[-1][2] = max(self.stack[-1][2], peak)
+            tracemalloc.reset_peak()
+        else:
+            current = None
+
+        self.stack.append([time.perf_counter(), current, 0])
+
+    def endStage(self, name:str, rows):
+        start, start_memory, child_peak = self.stack.pop()
+        seconds = time.perf_counter() - start
+
+        if self.memory:
+            peak = max(tracemalloc.get_traced_memory()[1], child_peak)
+            if self.stack:
+                self.stack[-1][2] = max(self.stack[-1][2], peak)
+            peak_bytes = peak - start_memory
+        else:
+            peak_bytes = None
+
+        record = StageRecord(name, len(self.stack), seconds, rows, peak_bytes)
+        self.records.append(record)
+
+        if self.callback is not None:
+            self.callback(record)
+
+    def toDataFrame(self)->pd.DataFrame:
+        """
+        Finished stages as a dataframe.
+        """
+        return pd.DataFrame(data=self.records, columns=StageRecord._fields)
+
+    def getSummary(self)->pd.DataFrame:
+        """
+        Stages aggregated by name - number of calls, total seconds, rows and the highest peak memory,
+        sorted by total seconds (descending). Nested stages are included in their parents' times.
+        """
+        summary = self.toDataFrame().groupby('name', sort=False).agg(
+            calls=('seconds', 'size'),
+            seconds=('seconds', 'sum'),
+            rows=('rows', 'sum'),
+            peak_bytes=('peak_bytes', 'max'))
+
+        return summary.sort_values('seconds', ascending=False, kind='stable')
+
+    def getTable(self)->str:
+        """
+        Stage summary (see getSummary) as a text table.
+        """
+        lines = [f'{"stage":<36} {"calls":>6} {"seconds":>9} {"rows":>10} {"peak MB":>9}']
+        for row in self.getSummary().itertuples():
+            peak = '' if pd.isna(row.peak_bytes) else f'{row.peak_bytes / 2**20:.1f}'
+            lines.append(f'{row.Index:<36} {row.calls:>6} {row.seconds:>9.4f} {int(row.rows):>10} {peak:>9}')
+
+        return '\n'.join(lines)
+
+@contextlib.contextmanager
+def profiling(profiler:Profiler):
+    """
+    Collect the stages run in the block into the profiler, None disables profiling.
+    """
+    global active_profiler
+
+    if profiler is None:
+        yield None
+        return
+
+    previous_profiler = active_profiler
+    start_tracing = profiler.memory and not tracemalloc.is_tracing()
+    if start_tracing:
+        tracemalloc.start()
+
+    active_profiler = profiler
+    try:
+        yield profiler
+    finally:
+        active_profiler = previous_profiler
+        if start_tracing:
+            tracemalloc.stop()
+
+@contextlib.contextmanager
+def runStage(profiler:Profiler, name:str, rows):
+    profiler.startStage()
+    try:
+        yield
+    finally:
+        profiler.endStage(name, rows)
+
+def stage(name:str, rows=None):
+    """
+    Context manager timing a named stage, a no-op when profiling is disabled.
+
+    Args:
+        name (str): stage name
+        rows (int): number of rows the stage processes
+    """
+    if active_profiler is None:
+        return NO_STAGE
+
+    return runStage(active_profiler, name, rows)
+
+def getRows(args, result)->int:
+    """
+    Rows of the first dataframe argument (or of the df attribute of a method's object),
+    otherwise rows of the returned dataframe.
+    """
+    for arg in args:
+        if isinstance(arg, pd.DataFrame):
+            return len(arg)
+        if isinstance(getattr(arg, 'df', None), pd.DataFrame):
+            return len(arg.df)
+
+    if isinstance(result, pd.DataFrame):
+        return len(result)
+
+    return None
+
+def profiled(name:str):
+    """
+    Decorator running the function as a named stage, see stage.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if active_profiler is None:
+                return function(*args, **kwargs)
+
+            profiler = active_profiler
+            profiler.startStage()
+            result = None
+            try:
+                result = function(*args, **kwargs)
+            finally:
+                profiler.endStage(name, getRows(args, result))
+
+            return result
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,205 @@
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+from udfs import df_udfs, io_udfs
+
+# description of the calendar columns with their types (semicolon separated, UTF-8 with BOM)
+DESCRIPTION_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'calendar_table_column_description.csv')
+
+# column names of the description file which differ from the calendar columns
+DESCRIPTION_ALIASES = {'m_name': 'month_name'}
+
+# SQL types of the types used in the description file, other types (char(n), nvarchar(n)) are used as they are
+SQL_TYPES = {'int': 'INTEGER', 'date': 'DATE', 'datetime': 'TIMESTAMP'}
+
+# indexes built after the load (date_key is the primary key)
+INDEX_COLUMNS = ['full_date', 'workday_id']
+
+# load modes - replace the table, or insert new and update existing rows by date_key
+LOAD_MODES = ['replace', 'upsert']
+
+# rows per executemany call
+DEFAULT_BATCH_SIZE = 10000
+
+def getColumnTypes(path=DESCRIPTION_FILE)->dict:
+    """
+    SQL types of the calendar columns from the column description file.
+
+    Returns:
+        dict: column -> SQL type
+    """
+    description = pd.read_csv(path, sep=';', encoding='utf-8-sig', dtype=str)
+    column_types = dict()
+
+    for column, column_type in zip(description['column_name'], description['column_type']):
+        column = DESCRIPTION_ALIASES.get(column, column)
+        column_types[column] = SQL_TYPES.get(column_type.lower(), column_type.upper())
+
+    return column_types
+
+def getSqlType(series:pd.Series)->str:
+    """
+    SQL type of a column missing in the description file, by its dtype.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return 'DATE'
+    if pd.api.types.is_integer_dtype(series) or pd.api.types.is_bool_dtype(series):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(series):
+        return 'REAL'
+
+    return 'TEXT'
+
+def getPlaceholder(paramstyle:str, position:int, column:str)->str:
+    """
+    Query parameter placeholder of a DB-API paramstyle.
+    """
+    if paramstyle == 'qmark':
+        return '?'
+    if paramstyle in ['format', 'pyformat']:
+        return '%s'
+    if paramstyle == 'numeric':
+        return f':{position + 1}'
+    if paramstyle == 'named':
+        return f':{column}'
+
+    raise ValueError(f'Unsupported paramstyle {paramstyle}')
+
+def getCreateTableSql(df:pd.DataFrame, table:str, column_types:dict=None)->str:
+    """
+    CREATE TABLE statement of the calendar columns with date_key as the primary key.
+    """
+    column_types = getColumnTypes() if column_types is None else column_types
+
+    definitions = list()
+    for column in df.columns:
+        definition = f'{column} {column_types.get(column) or getSqlType(df[column])}'
+        if column == 'date_key':
+            definition += ' PRIMARY KEY'
+        definitions.append(definition)
+
+    return f'CREATE TABLE IF NOT EXISTS {table} ({", ".join(definitions)})'
+
+def getInsertSql(columns:list, table:str, mode:str='replace', paramstyle:str='qmark')->str:
+    """
+    INSERT statement, in the upsert mode updating the existing rows with the same date_key.
+    """
+    placeholders = ', '.join(getPlaceholder(paramstyle, position, column) for position, column in enumerate(columns))
+    sql = f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({placeholders})'
+
+    if mode == 'upsert':
+        updates = ', '.join(f'{column} = excluded.{column}' for column in columns if column != 'date_key')
+        sql += f' ON CONFLICT (date_key) DO UPDATE SET {updates}' if updates else ' ON CONFLICT (date_key) DO NOTHING'
+
+    return sql
+
+def getSqlValues(df:pd.DataFrame)->list:
+    """
+    Columns converted to lists of Python values - dates as ISO strings, created as an ISO
+    timestamp, numbers as int or float and missing values as None.
+    """
+    values = list()
+
+    for column in df.columns:
+        series = df[column]
+
+        if pd.api.types.is_datetime64_any_dtype(series):
+            unit = 'us' if column == 'created' else 'D'
+            strings = np.datetime_as_string(series.to_numpy(dtype='datetime64[ns]').astype(f'datetime64[{unit}]'), unit=unit).astype(object)
+            strings[series.isna().to_numpy()] = None
+            if column == 'created':
+                strings = [None if s is None else s.replace('T', ' ') for s in strings]
+            values.append(list(strings))
+        elif isinstance(series.dtype, pd.api.extensions.ExtensionDtype) and series.hasnans:
+            values.append([None if pd.isna(value) else value for value in series.astype(object)])
+        elif isinstance(series.dtype, pd.api.extensions.ExtensionDtype) and pd.api.types.is_integer_dtype(series):
+            values.append(series.to_numpy(dtype=np.int64).tolist())
+        else:
+            values.append(series.to_numpy().tolist())
+
+    return values
+
+def loadCalendarChunks(chunks, connection, table:str='calendar', mode:str='replace', batch_size:int=DEFAULT_BATCH_SIZE, paramstyle:str='qmark')->int:
+    """
+    Load calendar chunks to a SQL table through a DB-API connection in one transaction.
+
+    The table is created with the typed schema of the column description file
+    (date_key is the primary key), rows are inserted with executemany in
+    batches and the indexes on full_date and workday_id are built after the
+    load. In the replace mode the table is dropped first, in the upsert mode
+    new rows are inserted and rows with an existing date_key are updated,
+    only the columns present in the chunks are written (e.g. date_key with
+    the refreshed current period flags).
+
+    Args:
+        chunks (iterable): calendar dataframes, e.g. from generateCalendar
+        connection: DB-API connection (e.g. sqlite3.connect('calendar.db'))
+        table (str): table name
+        mode (str): 'replace' or 'upsert'
+        batch_size (int): rows per executemany call
+        paramstyle (str): paramstyle of the DB-API module, qmark for sqlite3
+
+    Returns:
+        int: number of loaded rows
+    """
+    if mode not in LOAD_MODES:
+        raise ValueError(f'Load mode must be one of {LOAD_MODES}')
+
+    cursor = connection.cursor()
+    rows = 0
+
+    # sqlite3 runs DDL outside of its implicit transactions, the load including DROP and CREATE is one transaction
+    if isinstance(connection, sqlite3.Connection) and not connection.in_transaction:
+        cursor.execute('BEGIN')
+
+    try:
+        for i, df in enumerate(chunks):
+            df = df_udfs.expandCalendar(df)
+
+            if i == 0:
+                if mode == 'replace':
+                    cursor.execute(f'DROP TABLE IF EXISTS {table}')
+                cursor.execute(getCreateTableSql(df, table))
+                insert_sql = getInsertSql(list(df.columns), table, mode, paramstyle)
+                columns = list(df.columns)
+
+            values = getSqlValues(df[columns])
+            for start in range(0, len(df), batch_size):
+                batch = list(zip(*[column_values[start:start + batch_size] for column_values in values]))
+                if paramstyle == 'named':
+                    batch = [dict(zip(columns, row)) for row in batch]
+                cursor.executemany(insert_sql, batch)
+
+            rows += len(df)
+
+        for column in INDEX_COLUMNS:
+            if rows and column in columns:
+                cursor.execute(f'CREATE INDEX IF NOT EXISTS {table}_{column} ON {table} ({column})')
+
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    return rows
+
+def loadCalendar(df:pd.DataFrame, connection, table:str='calendar', mode:str='replace', batch_size:int=DEFAULT_BATCH_SIZE, paramstyle:str='qmark')->int:
+    """
+    Load calendar to a SQL table, see loadCalendarChunks.
+    """
+    return loadCalendarChunks([df], connection, table, mode, batch_size, paramstyle)
+
+def readCalendarSql(connection, table:str='calendar')->pd.DataFrame:
+    """
+    Read calendar from a SQL table with the date columns parsed, ordered by date_key.
+    """
+    df = pd.read_sql_query(f'SELECT * FROM {table} ORDER BY date_key', connection)
+
+    for column in io_udfs.DATE_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_datetime(df[column])
+
+    return df
@@ -1,3 +1,32 @@
+import numpy as np
+import pandas as pd
+from udfs import df_udfs, holidays_udfs, io_udfs, vectorized_udfs
+
+# offending rows kept per rule in the validation report
+DEFAULT_MAX_ROWS = 10
+
+# rows per chunk when validating a calendar file
+DEFAULT_CHUNK_ROWS = 100000
+
+# periods bracketed by the first_day_<period> and last_day_<period> columns
+BRACKET_PERIODS = ['year', 'quarter', 'month', 'week']
+
+# calendar validation rules as (rule, description, columns it needs, columns shown with the offending rows)
+CALENDAR_RULES = [
+    ('date_key_format', 'date_key is full_date as YYYYMMDD', ['date_key', 'full_date'], ['date_key', 'full_date']),
+    ('date_key_unique', 'date_key occurs only once', ['date_key'], ['date_key']),
+    ('date_key_continuity', 'every day follows the previous day', ['full_date'], ['date_key', 'full_date']),
+    ('workday_id_monotonic', 'workday_id grows by 0 or 1 from the previous day', ['workday_id'], ['date_key', 'full_date', 'workday_id']),
+    ('workday_id_consistency', 'workdays have the next workday_id and workday_date equal to full_date, other days another workday_date',
+        ['full_date', 'is_workday', 'workday_id', 'workday_date'], ['date_key', 'full_date', 'is_workday', 'workday_id', 'workday_date']),
+    ('workday_bracket', 'pwd < full_date <= nwd', ['full_date', 'pwd', 'nwd'], ['date_key', 'full_date', 'pwd', 'nwd']),
+    ('period_bracket', 'first_day_<period> <= full_date <= last_day_<period>', ['full_date'],
+        ['date_key', 'full_date'] + [f'{boundary}_{period}' for period in BRACKET_PERIODS for boundary in ['first_day', 'last_day']]),
+    ('holidays', 'is_holiday and holiday_name match the holiday rules', ['full_date', 'is_holiday', 'holiday_name'],
+        ['date_key', 'full_date', 'is_holiday', 'holiday_name']),
+    ('week_numbers', 'w and iso_w match the week of full_date', ['full_date', 'w', 'iso_w'], ['date_key', 'full_date', 'w', 'iso_w']),
+]
+
 def validStartYear(year):
     if not type(year) == int:
         raise ValueError('Number of years must be an integer')
@@ -12,4 +41,229 @@ def validForYears(for_years):
     if for_years < 1:
         raise ValueError('Number of years must be greater than 0')
     
-    return True
\ No newline at end of file
+    return True
+
+def validEngine(engine):
+    if engine not in ['vectorized', 'apply']:
+        raise ValueError("Engine must be 'vectorized' or 'apply'")
+
+    return True
+
+def validWorkers(workers):
+    if not type(workers) == int:
+        raise ValueError('Number of workers must be an integer')
+    if workers < 1:
+        raise ValueError('Number of workers must be greater than 0')
+
+    return True
+
+def validColumns(columns, known_columns):
+    unknown_columns = [column for column in columns if column not in known_columns]
+    if unknown_columns:
+        raise ValueError(f'Unknown columns {unknown_columns}')
+
+    return True
+
+class CalendarValidator:
+    """
+    Vectorized validation of calendar tables, chunk by chunk.
+
+    Chunks are validated in the calendar order, the last day, workday_id and
+    the seen date_keys are carried over, so rules comparing a day with the
+    previous one hold across chunk boundaries. Rules whose columns are
+    missing (e.g. with a column selection) are skipped.
+    """
+
+    def __init__(self, region:str='CZ', max_rows:int=DEFAULT_MAX_ROWS):
+        """
+        Args:
+            region (str): holiday rules region the holidays are checked against
+            max_rows (int): offending rows kept per rule
+        """
+        self.region = region
+        self.max_rows = max_rows
+        self.rows = 0
+        self.checked = None
+        self.failures = {rule: 0 for rule, _, _, _ in CALENDAR_RULES}
+        self.offending_rows = {rule: list() for rule, _, _, _ in CALENDAR_RULES}
+        self.seen_keys = np.array([], dtype=np.int64)
+        self.last_day = None
+        self.last_workday_id = None
+        self.last_workday_row_id = None
+
+    def getFailures(self, rule:str, df:pd.DataFrame, days:np.ndarray)->np.ndarray:
+        """
+        Offending rows of one rule in a chunk.
+
+        Args:
+            rule (str): rule of CALENDAR_RULES
+            df (DataFrame): calendar chunk in the standard schema
+            days (ndarray): full_date as days since 1970-01-01
+
+        Returns:
+            ndarray: bool mask of the offending rows
+        """
+        if rule == 'date_key_format':
+            dates = df['full_date'].to_numpy(dtype='datetime64[D]')
+            months = dates.astype('datetime64[M]')
+            keys = (months.astype('datetime64[Y]').astype(np.int64) + 1970) * 10000 + (months.astype(np.int64) % 12 + 1) * 100 \
+                + (dates - months).astype(np.int64) + 1
+            return df['date_key'].to_numpy(dtype=np.int64) != keys
+
+        if rule == 'date_key_unique':
+            keys = df['date_key'].to_numpy(dtype=np.int64)
+            return pd.Series(keys).duplicated().to_numpy() | np.isin(keys, self.seen_keys)
+
+        if rule == 'date_key_continuity':
+            previous_days = np.concatenate([[days[0] - 1 if self.last_day is None else self.last_day], days[:-1]])
+            return days - previous_days != 1
+
+        if rule == 'workday_id_monotonic':
+            workday_id = df['workday_id'].to_numpy(dtype=np.int64)
+            previous_id = np.concatenate([[workday_id[0] if self.last_workday_id is None else self.last_workday_id], workday_id[:-1]])
+            return ~np.isin(workday_id - previous_id, [0, 1])
+
+        if rule == 'workday_id_consistency':
+            is_workday = df['is_workday'].to_numpy() == 1
+            workday_id = df['workday_id'].to_numpy(dtype=np.int64)
+            workday_ids = workday_id[is_workday]
+
+            failures = (df['workday_date'].to_numpy(dtype='datetime64[D]').astype(np.int64) == days) != is_workday
+
+            # the id sequence starts at the first workday seen, a chunk without workdays has none to check
+            if len(workday_ids):
+                first_id = workday_ids[0] - 1 if self.last_workday_row_id is None else self.last_workday_row_id
+                previous_ids = np.concatenate([[first_id], workday_ids[:-1]])
+                failures[is_workday] |= workday_ids != previous_ids + 1
+            return failures
+
+        if rule == 'workday_bracket':
+            return ~((df['pwd'] < df['full_date']) & (df['full_date'] <= df['nwd'])).to_numpy()
+
+        if rule == 'period_bracket':
+            failures = np.zeros(len(df), dtype=bool)
+            for period in BRACKET_PERIODS:
+                if f'first_day_{period}' in df.columns and f'last_day_{period}' in df.columns:
+                    failures |= ~((df[f'first_day_{period}'] <= df['full_date']) & (df['full_date'] <= df[f'last_day_{period}'])).to_numpy()
+            return failures
+
+        if rule == 'holidays':
+            dates = df['full_date']
+            expected = holidays_udfs.Holidays(pd.DataFrame({
+                'full_date': dates, 'y': dates.dt.year, 'm': dates.dt.month, 'd': dates.dt.day}), self.region).insertHolidays()
+            holiday_name = df['holiday_name'].astype(object).fillna('').to_numpy()
+            return (df['is_holiday'].to_numpy() != expected['is_holiday'].to_numpy()) | (holiday_name != expected['holiday_name'].to_numpy())
+
+        if rule == 'week_numbers':
+            dates = df['full_date'].to_numpy(dtype='datetime64[D]')
+            return (df['w'].to_numpy(dtype=np.int64) != vectorized_udfs.getWeeks(dates)) \
+                | (df['iso_w'].to_numpy(dtype=np.int64) != vectorized_udfs.getIsoWeeks(dates))
+
+        raise ValueError(f'Unknown rule {rule}')
+
+    def update(self, df:pd.DataFrame):
+        """
+        Validate the next chunk of the calendar (standard or compact schema).
+        """
+        if len(df) == 0:
+            return
+
+        df = df_udfs.expandCalendar(df.reset_index(drop=True))
+        days = df['full_date'].to_numpy(dtype='datetime64[D]').astype(np.int64) if 'full_date' in df.columns else None
+
+        if self.checked is None:
+            self.checked = {rule: all(column in df.columns for column in columns) for rule, _, columns, _ in CALENDAR_RULES}
+
+        for rule, _, _, shown_columns in CALENDAR_RULES:
+            if not self.checked[rule]:
+                continue
+
+            failures = np.flatnonzero(self.getFailures(rule, df, days))
+            self.failures[rule] += len(failures)
+
+            missing_rows = self.max_rows - len(self.offending_rows[rule])
+            if len(failures) and missing_rows > 0:
+                rows = df.iloc[failures[:missing_rows]][[column for column in shown_columns if column in df.columns]]
+                rows.insert(0, 'row', failures[:missing_rows] + self.rows)
+                for column in rows.columns:
+                    if pd.api.types.is_datetime64_any_dtype(rows[column]):
+                        rows[column] = rows[column].dt.strftime('%Y-%m-%d')
+                self.offending_rows[rule].extend(rows.astype(object).where(rows.notna(), None).to_dict('records'))
+
+        # state carried over to the next chunk
+        if 'date_key' in df.columns:
+            self.seen_keys = np.union1d(self.seen_keys, df['date_key'].to_numpy(dtype=np.int64))
+        if days is not None:
+            self.last_day = days[-1]
+        if 'workday_id' in df.columns:
+            self.last_workday_id = int(df['workday_id'].iloc[-1])
+            if 'is_workday' in df.columns and (df['is_workday'] == 1).any():
+                self.last_workday_row_id = int(df.loc[df['is_workday'] == 1, 'workday_id'].iloc[-1])
+
+        self.rows += len(df)
+
+    def getReport(self)->dict:
+        """
+        Validation report.
+
+        Returns:
+            dict: rows, valid and per rule its description, whether it was checked,
+                the number of failures and the first offending rows as dicts
+        """
+        checked = self.checked or dict()
+
+        return {
+            'rows': self.rows,
+            'region': self.region,
+            'valid': all(failures == 0 for failures in self.failures.values()),
+            'rules': {
+                rule: {
+                    'description': description,
+                    'checked': checked.get(rule, False),
+                    'failures': self.failures[rule],
+                    'rows': self.offending_rows[rule]}
+                for rule, description, _, _ in CALENDAR_RULES}}
+
+def validateCalendarChunks(chunks, region:str='CZ', max_rows:int=DEFAULT_MAX_ROWS)->dict:
+    """
+    Validate calendar chunks in the calendar order, see CalendarValidator.
+
+    Args:
+        chunks (iterable): calendar dataframes, e.g. from generateCalendar or io_udfs.readCalendarChunks
+        region (str): holiday rules region the holidays are checked against
+        max_rows (int): offending rows kept per rule
+
+    Returns:
+        dict: validation report, see CalendarValidator.getReport
+    """
+    validator = CalendarValidator(region, max_rows)
+    for df in chunks:
+        validator.update(df)
+
+    return validator.getReport()
+
+def validateCalendar(df:pd.DataFrame, region:str='CZ', max_rows:int=DEFAULT_MAX_ROWS)->dict:
+    """
+    Validate a calendar, see validateCalendarChunks.
+    """
+    return validateCalendarChunks([df], region, max_rows)
+
+def validateCalendarFile(path, format:str=None, region:str='CZ', max_rows:int=DEFAULT_MAX_ROWS, chunk_rows:int=DEFAULT_CHUNK_ROWS)->dict:
+    """
+    Validate a calendar file chunk by chunk, see validateCalendarChunks and io_udfs.readCalendarChunks.
+    """
+    return validateCalendarChunks(io_udfs.readCalendarChunks(path, format, chunk_rows), region, max_rows)
+
+def getReportTable(report:dict)->str:
+    """
+    Validation report as text - one line per rule followed by its offending rows.
+    """
+    lines = [f'{report["rows"]} rows, {"valid" if report["valid"] else "INVALID"}']
+
+    for rule, result in report['rules'].items():
+        status = f'{result["failures"]} failures' if result['checked'] else 'skipped'
+        lines.append(f'{rule:<24} {status:<14} {result["description"]}')
+        if result['rows']:
+            lines.append(pd.DataFrame(result['rows']).to_string(index=False))
+
+    return '\n'.join(lines)
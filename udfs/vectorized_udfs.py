@@ -0,0 +1,241 @@
+import pandas as pd
+import numpy as np
+from udfs import date_udfs
+
+# day suffix for day numbers 0-31 (index 0 is never used)
+DAY_SUFFIXES = np.array(['th'] + [date_udfs.suffixConditions(day) for day in range(1, 32)], dtype=object)
+
+def getDaySuffixes(days)->np.ndarray:
+    """Day suffix ('st', 'nd', 'rd', 'th') for an array of day numbers.
+
+    Vectorized variant of date_udfs.suffixConditions.
+    """
+    return DAY_SUFFIXES[np.asarray(days, dtype=np.int64)]
+
+def getYearMonths(years, months, months_add:int)->np.ndarray:
+    """Year with month in format YYYY-MM shifted by months_add months.
+
+    Vectorized variant of date_udfs.getYearMonth. Labels are formatted once
+    per distinct month and broadcast back to the rows.
+    """
+    month_index = np.asarray(years, dtype=np.int64) * 12 + np.asarray(months, dtype=np.int64) - 1 + months_add
+    unique_months, inverse = np.unique(month_index, return_inverse=True)
+    labels = np.array([f'{mi // 12}-{mi % 12 + 1:0>2}' for mi in unique_months], dtype=object)
+
+    return labels[inverse]
+
+def isWeekend(wkd)->np.ndarray:
+    """Identify weekend (1) for an array of weekdays (0 = Monday, 6 = Sunday)."""
+    return (np.asarray(wkd) >= 5).astype(np.int64)
+
+def isWeekday(wkd)->np.ndarray:
+    """Identify weekday (1) for an array of weekdays (0 = Monday, 6 = Sunday)."""
+    return (np.asarray(wkd) < 5).astype(np.int64)
+
+def getPreviousWeekDays(full_date:pd.Series, wkd)->pd.Series:
+    """Previous weekday, vectorized variant of date_udfs.getPreviousWeekDay."""
+    wkd = np.asarray(wkd)
+    days_back = np.select([wkd == 0, wkd == 6], [3, 2], default=1)
+
+    return full_date - pd.to_timedelta(days_back, unit='D')
+
+def getNextWeekDays(full_date:pd.Series, wkd)->pd.Series:
+    """Next weekday, vectorized variant of date_udfs.getNextWeekDay."""
+    wkd = np.asarray(wkd)
+    days_forward = np.select([wkd == 4, wkd == 5], [3, 2], default=1)
+
+    return full_date + pd.to_timedelta(days_forward, unit='D')
+
+def isWorkday(is_weekend, is_holiday)->np.ndarray:
+    """Identify workday (1) - neither weekend nor holiday."""
+    return ((np.asarray(is_weekend) == 0) & (np.asarray(is_holiday) == 0)).astype(np.int64)
+
+def toEpochDays(dates)->np.ndarray:
+    """Days since 1970-01-01 for an array of dates (datetime64 or int32 epoch days of the compact schema)."""
+    dates = np.asarray(dates)
+
+    if np.issubdtype(dates.dtype, np.integer):
+        return dates.astype(np.int64)
+
+    return dates.astype('datetime64[D]').astype(np.int64)
+
+def getCurrentPeriods(df:pd.DataFrame, current_date:pd.Timestamp)->dict:
+    """Current period flags for the whole calendar compared against one date.
+
+    Vectorized variant of date_udfs.getCurrentPeriod, the current date is
+    resolved once instead of once per row.
+
+    Args:
+        df (DataFrame): calendar with columns full_date, y, m, q and w
+        current_date (Timestamp): date the flags are computed for
+
+    Returns:
+        dict: column name -> int array for is_today, is_current_week,
+            is_current_month, is_current_quarter and is_current_year
+    """
+    today = np.datetime64(current_date.date(), 'D').astype(np.int64)
+    is_current_year = df['y'].to_numpy() == current_date.year
+
+    return {
+        'is_today': (toEpochDays(df['full_date']) == today).astype(np.int64),
+        'is_current_week': ((df['w'].to_numpy() == date_udfs.getWeek(current_date)) & is_current_year).astype(np.int64),
+        'is_current_month': ((df['m'].to_numpy() == current_date.month) & is_current_year).astype(np.int64),
+        'is_current_quarter': ((df['q'].to_numpy() == current_date.quarter) & is_current_year).astype(np.int64),
+        'is_current_year': is_current_year.astype(np.int64),
+    }
+
+def getReportDays(df:pd.DataFrame, current_date:pd.Timestamp)->np.ndarray:
+    """Report day flag (1) - days of the workday which is the previous workday of the current date.
+
+    Args:
+        df (DataFrame): calendar with columns full_date, pwd and workday_date
+        current_date (Timestamp): date the flag is computed for
+
+    Returns:
+        ndarray: int flag for every day
+    """
+    today = np.datetime64(current_date.date(), 'D').astype(np.int64)
+    report_day = toEpochDays(df['pwd'])[toEpochDays(df['full_date']) == today]
+
+    if len(report_day) != 1:
+        return np.zeros(len(df), dtype=np.int64)
+
+    return (toEpochDays(df['workday_date']) == report_day[0]).astype(np.int64)
+
+def getWorkdayPositions(full_date:pd.Series, is_workday)->np.ndarray:
+    """Position of the workday each calendar day belongs to in the sorted workday array.
+
+    A day belongs to the last workday on or before it within the same month,
+    days before the first workday of a month belong to that first workday.
+
+    Args:
+        full_date (Series): calendar dates sorted ascending
+        is_workday (array): workday flag for each date
+
+    Returns:
+        ndarray: index into the workdays (full_date[is_workday == 1]) for every date
+    """
+    dates = full_date.to_numpy(dtype='datetime64[D]')
+    workdays = dates[np.asarray(is_workday) == 1]
+
+    previous = np.searchsorted(workdays, dates, side='right') - 1
+    following = np.searchsorted(workdays, dates, side='left')
+    in_month = (previous >= 0) & (workdays.astype('datetime64[M]')[np.maximum(previous, 0)] == dates.astype('datetime64[M]'))
+
+    return np.where(in_month, previous, following)
+
+def getIsoWeeks(dates)->np.ndarray:
+    """ISO 8601 week number for an array of dates.
+
+    The ISO week is counted from the first Thursday of the ISO year, the week
+    of a date is the week of the Thursday in the same Monday-Sunday week.
+    """
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    wkd = (dates.astype(np.int64) + 3) % 7 # 1970-01-01 is Thursday
+    thursday = dates - wkd + 3
+    iso_year_start = thursday.astype('datetime64[Y]').astype('datetime64[D]')
+
+    return (thursday - iso_year_start).astype(np.int64) // 7 + 1
+
+def getWeeks(full_date)->np.ndarray:
+    """Week number in year, vectorized variant of date_udfs.getWeek.
+
+    The week follows the ISO week shifted by one when January 1st belongs to
+    the last ISO week of the previous year, so that the week containing
+    January 1st is week 1 and the last days of December never fall into week 1.
+    """
+    dates = np.asarray(full_date, dtype='datetime64[D]')
+    year_start = dates.astype('datetime64[Y]')
+    iso_w = getIsoWeeks(dates)
+    first_iso_w = getIsoWeeks(year_start.astype('datetime64[D]'))
+    last_iso_w = getIsoWeeks((year_start + 1).astype('datetime64[D]') - 4) # 28th of December
+    months = dates.astype('datetime64[M]') - year_start.astype('datetime64[M]') + 1
+    shift = (first_iso_w > 50).astype(np.int64)
+
+    return np.select(
+        [(months == 12) & (iso_w == 1), (shift == 1) & (months == 1) & (iso_w > 50)],
+        [last_iso_w + 1 + shift, 1],
+        default=iso_w + shift)
+
+def getWeekMonths(full_date, w)->np.ndarray:
+    """Week number in month - week numbers are consecutive within a month,
+    so it is the offset from the week of the first day in the month.
+    """
+    first_day_month = np.asarray(full_date, dtype='datetime64[M]').astype('datetime64[D]')
+
+    return np.asarray(w, dtype=np.int64) - getWeeks(first_day_month) + 1
+
+def getWeekBoundaries(full_date, wkd)->tuple:
+    """First and last day in week (Monday-Sunday) cut at the year boundaries.
+
+    Returns:
+        tuple: first_day_week and last_day_week as datetime64[ns] arrays
+    """
+    dates = np.asarray(full_date, dtype='datetime64[D]')
+    wkd = np.asarray(wkd, dtype=np.int64)
+    year_start = dates.astype('datetime64[Y]')
+
+    first_day_week = np.maximum(dates - wkd, year_start.astype('datetime64[D]'))
+    last_day_week = np.minimum(dates + 6 - wkd, (year_start + 1).astype('datetime64[D]') - 1)
+
+    return first_day_week.astype('datetime64[ns]'), last_day_week.astype('datetime64[ns]')
+
+def getPeriodBoundaries(full_date, period:str)->tuple:
+    """First and last day in year, quarter or month computed from the dates.
+
+    Vectorized variant of date_udfs.getColumnBy over whole periods - the
+    calendar always covers whole years.
+
+    Args:
+        full_date (array): dates
+        period (str): 'year', 'quarter' or 'month'
+
+    Returns:
+        tuple: first and last day in the period as datetime64[ns] arrays
+    """
+    months = np.asarray(full_date, dtype='datetime64[M]')
+
+    if period == 'year':
+        first_month = months.astype('datetime64[Y]').astype('datetime64[M]')
+        period_months = 12
+    elif period == 'quarter':
+        first_month = months - months.astype(np.int64) % 3
+        period_months = 3
+    elif period == 'month':
+        first_month = months
+        period_months = 1
+    else:
+        raise ValueError("Period must be 'year', 'quarter' or 'month'")
+
+    first_day = first_month.astype('datetime64[D]')
+    last_day = (first_month + period_months).astype('datetime64[D]') - 1
+
+    return first_day.astype('datetime64[ns]'), last_day.astype('datetime64[ns]')
+
+def getWorkdayMonthBoundaries(full_date, is_workday)->tuple:
+    """First and last workday in month of every date.
+
+    The boundaries are resolved once per month from the sorted workdays and
+    broadcast back to the dates, months without workdays get NaT.
+
+    Args:
+        full_date (array): calendar dates sorted ascending
+        is_workday (array): workday flag for each date
+
+    Returns:
+        tuple: first_workday_in_month and last_workday_in_month as datetime64[ns] arrays
+    """
+    dates = np.asarray(full_date, dtype='datetime64[D]')
+    workdays = dates[np.asarray(is_workday) == 1]
+    months, inverse = np.unique(dates.astype('datetime64[M]'), return_inverse=True)
+
+    first_position = np.searchsorted(workdays, months.astype('datetime64[D]'), side='left')
+    last_position = np.searchsorted(workdays, (months + 1).astype('datetime64[D]'), side='left') - 1
+    has_workday = first_position <= last_position
+
+    # workdays padded with NaT for the months without workdays
+    padded_workdays = np.concatenate([workdays, [np.datetime64('NaT', 'D')]])
+    first_workday = padded_workdays[np.where(has_workday, first_position, len(workdays))]
+    last_workday = padded_workdays[np.where(has_workday, last_position, len(workdays))]
+
+    return first_workday[inverse].astype('datetime64[ns]'), last_workday[inverse].astype('datetime64[ns]')